@@ -35,6 +35,25 @@ def create_app(config_class=Config):
     def load_user(user_id):
         return User.query.get(int(user_id))
 
+    # Expose batched post engagement to templates
+    from app.services import post_engagement
+
+    @app.context_processor
+    def inject_engagement():
+        return {'engagement': post_engagement}
+
+    # Expose the navbar's unread counters, cached per user
+    from flask import has_request_context
+    from flask_login import current_user
+    from app.services import unread_counts
+
+    @app.context_processor
+    def inject_unread_counts():
+        # Templates are also rendered outside requests, e.g. the shared public feed's cards
+        if not has_request_context() or not current_user.is_authenticated:
+            return {}
+        return {'unread': unread_counts(current_user.id)}
+
     # Import blueprints
     from app.main.routes import main
     from app.api.routes import api
@@ -43,4 +62,21 @@ def create_app(config_class=Config):
     app.register_blueprint(main)
     app.register_blueprint(api, url_prefix='/api')
 
+    # Initialize caches
+    from app.services import (init_feed_cache, init_public_feed, init_event_broker, init_unread_cache,
+                              init_outbox_dispatcher)
+    init_feed_cache(app)
+    init_public_feed(app)
+    init_event_broker(app)
+    init_unread_cache(app)
+    init_outbox_dispatcher(app)
+
+    # Compress responses and serve precompressed static files
+    from app.compression import CompressionMiddleware
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, app)
+
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+
     return app
\ No newline at end of file
@@ -1,113 +1,233 @@
-from flask import jsonify, request
+from datetime import datetime, timezone
+from flask import jsonify, request, current_app, url_for, abort
 from flask_login import login_required, current_user
 from app import db
 from app.api import api
 from app.models import User, Post, Comment, Message, Notification, PostLike
+from app.services import (get_feed_cache, posts_query, encode_cursor, decode_cursor, post_version, user_version,
+                          conditional_response, thread_filter, load_thread, sync_read_flags,
+                          load_notifications, notifications_query)
+from app.services.feed_item import POST_ITEM
+from app.api.streaming import stream_format, stream_rows
+from app.api.serializers import POST_SCHEMA, USER_SCHEMA, COMMENT_SCHEMA, NOTIFICATION_SCHEMA, MESSAGE_SCHEMA
+
+POST_DETAIL_FIELDS = ('id', 'title', 'content', 'date_posted', 'author', 'like_count')
+USER_POST_FIELDS = ('id', 'title', 'content', 'date_posted', 'like_count', 'comment_count')
+
+
+def _parse_since(value):
+    """Parse an ISO 8601 ``since`` parameter into a naive UTC datetime"""
+    since = datetime.fromisoformat(value)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def _posts_query(fields, author_ids=None, since=None, limit=None, before=None):
+    """Select the post columns of ``fields`` after the id and date of the cursor position"""
+    return POST_SCHEMA.join(posts_query(POST_SCHEMA.columns(fields), author_ids, since, limit, before), fields)
+
+
+def _page_limit():
+    """Read ?limit=, capped at ``API_MAX_PAGE_SIZE``; raises ``ValueError`` if it is not positive"""
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, current_app.config['API_MAX_PAGE_SIZE'])
+
+
+def _before_page(response, before, endpoint, **values):
+    """Advertise the next page of a ?before=<id> list in the response headers"""
+    if before:
+        args = request.args.to_dict()
+        args['before'] = before
+        response.headers['X-Next-Cursor'] = str(before)
+        response.headers['Link'] = f'<{url_for(endpoint, **values, **args)}>; rel="next"'
+    return response
+
 
 @api.route('/posts')
 def get_posts():
-    posts = Post.query.order_by(Post.date_posted.desc()).all()
-    return jsonify([{
-        'id': post.id,
-        'title': post.title,
-        'content': post.content,
-        'date_posted': post.date_posted.isoformat(),
-        'author': {
-            'id': post.author.id,
-            'username': post.author.username,
-            'first_name': post.author.first_name,
-            'last_name': post.author.last_name,
-            'location': post.author.location
-        },
-        'like_count': post.like_count(),
-        'comment_count': len(post.comments)
-    } for post in posts])
+    author_id = request.args.get('author_id', type=int)
+    author_ids = [author_id] if author_id is not None else None
+    try:
+        limit = _page_limit()
+        fields = POST_SCHEMA.parse_fields(request.args.get('fields'))
+        since = _parse_since(request.args['since']) if request.args.get('since') else None
+        before = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        stream = stream_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Rows start with the post's id and date, for the cursor
+    serialize = POST_SCHEMA.compile(fields, offset=2)
+    # Streams are bulk exports: every matching post, without a page limit
+    if stream:
+        return stream_rows(_posts_query(fields, author_ids, since, None, before), serialize, stream)
+
+    rows = db.session.execute(_posts_query(fields, author_ids, since, limit + 1, before)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], POST_ITEM, rows[-1][0])
+
+    response = jsonify([serialize(row) for row in rows])
+    # The next page is advertised in headers so the body stays a plain list
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("api.get_posts", **args)}>; rel="next"'
+    return response
 
 @api.route('/posts/<int:post_id>')
 def get_post(post_id):
-    post = Post.query.get_or_404(post_id)
+    stamps = post_version(post_id)
+    if stamps is None:
+        abort(404)
+    return conditional_response(stamps, lambda: _post_detail_json(post_id))
+
+def _post_detail_json(post_id):
+    post = db.session.execute(POST_SCHEMA.select(POST_DETAIL_FIELDS).where(Post.id == post_id)).first()
+    if post is None:
+        abort(404)
+    comments = db.session.execute(COMMENT_SCHEMA.select().where(Comment.post_id == post_id).order_by(Comment.id))
+    serialize_comment = COMMENT_SCHEMA.compile()
     return jsonify({
-        'id': post.id,
-        'title': post.title,
-        'content': post.content,
-        'date_posted': post.date_posted.isoformat(),
-        'author': {
-            'id': post.author.id,
-            'username': post.author.username,
-            'first_name': post.author.first_name,
-            'last_name': post.author.last_name,
-            'location': post.author.location
-        },
-        'like_count': post.like_count(),
-        'comments': [{
-            'id': comment.id,
-            'content': comment.content,
-            'date_posted': comment.date_posted.isoformat(),
-            'author': {
-                'id': comment.author.id,
-                'username': comment.author.username,
-                'first_name': comment.author.first_name,
-                'last_name': comment.author.last_name
-            }
-        } for comment in post.comments]
+        **POST_SCHEMA.compile(POST_DETAIL_FIELDS)(post),
+        'comments': [serialize_comment(row) for row in comments]
     })
 
 @api.route('/users/<int:user_id>')
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
+    stamps = user_version(user_id)
+    if stamps is None:
+        abort(404)
+    return conditional_response(stamps, lambda: jsonify(_load_users([user_id])[user_id]))
+
+def _load_users(user_ids):
+    """Load users, with their post counts, in one IN query keyed by id"""
+    serialize = USER_SCHEMA.compile(offset=1)
+    rows = db.session.execute(db.select(User.id, *USER_SCHEMA.columns()).where(User.id.in_(user_ids)))
+    return {row[0]: serialize(row) for row in rows}
+
+def _batch_ids():
+    """Parse the ids of a batch request from ?ids=1,2,3 (or repeated ids=).
+
+    Raises ``ValueError`` for missing or malformed ids, or too many of them.
+    """
+    raw = ','.join(request.args.getlist('ids'))
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError(f"Invalid ids: {raw!r}") from None
+    if not ids:
+        raise ValueError('ids is required')
+    max_ids = current_app.config['API_BATCH_MAX_IDS']
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids per batch")
+    return ids
+
+def _batch_json(ids, results):
+    """Key batch results by id and list the ids that were not found"""
     return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'first_name': user.first_name,
-        'last_name': user.last_name,
-        'location': user.location,
-        'bio': user.bio,
-        'children_count': user.children_count,
-        'date_joined': user.date_joined.isoformat(),
-        'post_count': len(user.posts)
+        'results': {str(item_id): results[item_id] for item_id in ids if item_id in results},
+        'missing': [item_id for item_id in ids if item_id not in results]
     })
 
+@api.route('/posts:batch')
+def get_posts_batch():
+    try:
+        fields = POST_SCHEMA.parse_fields(request.args.get('fields'))
+        ids = _batch_ids()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Counts come from the post's counter columns, so one query covers the batch
+    serialize = POST_SCHEMA.compile(fields, offset=1)
+    rows = db.session.execute(POST_SCHEMA.join(db.select(Post.id, *POST_SCHEMA.columns(fields)), fields).where(Post.id.in_(ids)))
+    return _batch_json(ids, {row[0]: serialize(row) for row in rows})
+
+@api.route('/users:batch')
+def get_users_batch():
+    try:
+        ids = _batch_ids()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return _batch_json(ids, _load_users(ids))
+
 @api.route('/users/<int:user_id>/posts')
 def get_user_posts(user_id):
     user = User.query.get_or_404(user_id)
-    posts = Post.query.filter_by(author=user).order_by(Post.date_posted.desc()).all()
-    return jsonify([{
-        'id': post.id,
-        'title': post.title,
-        'content': post.content,
-        'date_posted': post.date_posted.isoformat(),
-        'like_count': post.like_count(),
-        'comment_count': len(post.comments)
-    } for post in posts])
+    try:
+        stream = stream_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    query = _posts_query(USER_POST_FIELDS, [user.id])
+    serialize = POST_SCHEMA.compile(USER_POST_FIELDS, offset=2)
+    if stream:
+        return stream_rows(query, serialize, stream)
+    return jsonify([serialize(row) for row in db.session.execute(query)])
 
 @api.route('/notifications')
 @login_required
 def get_notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.timestamp.desc()).all()
-    return jsonify([{
-        'id': notification.id,
-        'content': notification.content,
-        'timestamp': notification.timestamp.isoformat(),
-        'is_read': notification.is_read,
-        'notification_type': notification.notification_type
-    } for notification in notifications])
+    try:
+        stream = stream_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    actor_id = request.args.get('actor_id', type=int)
+    target = None
+    if request.args.get('target_type'):
+        target_id = request.args.get('target_id', type=int)
+        if target_id is None:
+            return jsonify({'error': 'target_type needs a target_id'}), 400
+        target = (request.args['target_type'], target_id)
+
+    # Rows start with the notification's id and timestamp, for the cursor
+    serialize = NOTIFICATION_SCHEMA.compile(offset=2)
+    # Streams are bulk exports of every matching notification, newest first
+    if stream:
+        query = notifications_query(NOTIFICATION_SCHEMA.columns(), current_user.id, actor_id=actor_id, target=target)
+        return stream_rows(query, serialize, stream)
+
+    try:
+        limit = _page_limit()
+        page = load_notifications(NOTIFICATION_SCHEMA.columns(), current_user.id, limit,
+                                  request.args.get('before', type=int), actor_id, target)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return _before_page(jsonify([serialize(row) for row in page.notifications]), page.before, 'api.get_notifications')
 
 @api.route('/messages/<int:user_id>')
 @login_required
 def get_messages(user_id):
-    messages = Message.query.filter(
-        db.or_(
-            db.and_(Message.sender_id == current_user.id, Message.recipient_id == user_id),
-            db.and_(Message.sender_id == user_id, Message.recipient_id == current_user.id)
-        )
-    ).order_by(Message.timestamp.asc()).all()
-    
-    return jsonify([{
-        'id': message.id,
-        'content': message.content,
-        'timestamp': message.timestamp.isoformat(),
-        'sender_id': message.sender_id,
-        'recipient_id': message.recipient_id,
-        'is_read': message.is_read
-    } for message in messages])
\ No newline at end of file
+    try:
+        stream = stream_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Read state is kept as watermarks on the conversation; bring the messages' is_read flags up to date first
+    if sync_read_flags(current_user.id, user_id):
+        db.session.commit()
+    # Streams are bulk exports of the whole conversation, oldest first
+    if stream:
+        query = MESSAGE_SCHEMA.select().where(thread_filter(current_user.id, user_id)).order_by(Message.timestamp.asc())
+        return stream_rows(query, MESSAGE_SCHEMA.compile(), stream)
+
+    try:
+        limit = _page_limit()
+        page = load_thread(MESSAGE_SCHEMA.columns(), current_user.id, user_id, limit,
+                           request.args.get('before', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Rows start with the message's id and timestamp, for the cursor
+    serialize = MESSAGE_SCHEMA.compile(offset=2)
+    return _before_page(jsonify([serialize(row) for row in page.messages]), page.before,
+                        'api.get_messages', user_id=user_id)
+
+@api.route('/metrics/feed-cache')
+@login_required
+def get_feed_cache_stats():
+    return jsonify(get_feed_cache().stats())
@@ -0,0 +1,197 @@
+from app import db
+from app.models import User, Post, Comment, Message, Notification
+
+# Characters of content returned as a post's snippet
+SNIPPET_LENGTH = 140
+
+# Compiled serializers kept per schema; the oldest is dropped beyond this
+COMPILED_CACHE_SIZE = 64
+
+
+def isoformat(value):
+    """Format a datetime for JSON, passing ``None`` through"""
+    return value.isoformat() if value is not None else None
+
+
+class Field:
+    """A field read from one selected column, optionally converted"""
+
+    def __init__(self, column, convert=None):
+        self.column = column
+        self.convert = convert
+
+
+class Nested:
+    """A field serialized as an object of sub-fields.
+
+    ``join`` is the ``(target, onclause)`` that brings the sub-fields'
+    table into a query.
+    """
+
+    def __init__(self, fields, join=None):
+        self.fields = fields
+        self.join = join
+
+
+class Schema:
+    """The fields an API resource can return and the columns behind them.
+
+    ``select`` builds a query for a subset of the fields and ``compile``
+    turns the same subset into a function from result rows to dicts. Rows
+    are read by position, so no ORM objects are built; the function's
+    source is generated once per field subset and cached. Field lists are
+    deduplicated and put in the schema's declared order first, so every
+    ordering of a subset shares one query shape and one compiled function.
+    """
+
+    def __init__(self, fields, default=None):
+        self.fields = fields
+        self.default = tuple(default or fields)
+        self._compiled = {}
+
+    def parse_fields(self, value):
+        """Parse a comma-separated ?fields= value, or return the default fields.
+
+        Raises ``ValueError`` for unknown fields.
+        """
+        if not value:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in value.split(',')))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return names
+
+    def _normalize(self, names):
+        """Return ``names`` (or the default fields) once each, in declared order"""
+        wanted = set(names or self.default)
+        return tuple(name for name in self.fields if name in wanted)
+
+    def _walk(self, names):
+        """Yield the plain fields of ``names`` in column order"""
+        for name in self._normalize(names):
+            field = self.fields[name]
+            if isinstance(field, Nested):
+                yield from field.fields.values()
+            else:
+                yield field
+
+    def columns(self, names=None):
+        """Return the columns behind ``names``, in the order ``compile`` reads them"""
+        return [field.column for field in self._walk(names or self.default)]
+
+    def join(self, query, names=None):
+        """Add the joins that ``names`` need to a query, each once"""
+        joins = []
+        for name in self._normalize(names):
+            field = self.fields[name]
+            if isinstance(field, Nested) and field.join is not None and field.join not in joins:
+                joins.append(field.join)
+        for join in joins:
+            query = query.join(*join)
+        return query
+
+    def select(self, names=None):
+        """Select the columns of ``names``"""
+        return self.join(db.select(*self.columns(names)), names)
+
+    def compile(self, names=None, offset=0):
+        """Return a function turning a row into a dict of ``names``.
+
+        The row's first ``offset`` columns are skipped, for queries that
+        select extra columns (such as a cursor position) ahead of the schema's.
+        """
+        names = self._normalize(names)
+        key = (names, offset)
+        if key not in self._compiled:
+            if len(self._compiled) >= COMPILED_CACHE_SIZE:
+                del self._compiled[next(iter(self._compiled))]
+            self._compiled[key] = self._generate(names, offset)
+        return self._compiled[key]
+
+    def _generate(self, names, offset):
+        namespace = {}
+        position = offset
+
+        def expression(field):
+            nonlocal position
+            if isinstance(field, Nested):
+                return '{' + ', '.join(f'{name!r}: {expression(sub)}' for name, sub in field.fields.items()) + '}'
+            value = f'row[{position}]'
+            position += 1
+            if field.convert is not None:
+                converter = f'_convert{len(namespace)}'
+                namespace[converter] = field.convert
+                value = f'{converter}({value})'
+            return value
+
+        body = ', '.join(f'{name!r}: {expression(self.fields[name])}' for name in names)
+        exec(f'def serialize(row):\n    return {{{body}}}\n', namespace)
+        return namespace['serialize']
+
+
+def _author(join_column, *names):
+    """Nest the named User fields of the author joined on ``join_column``"""
+    return Nested(
+        {name: Field(getattr(User, name)) for name in names},
+        join=(User, User.id == join_column)
+    )
+
+
+POST_SCHEMA = Schema({
+    'id': Field(Post.id),
+    'title': Field(Post.title),
+    'content': Field(Post.content),
+    'snippet': Field(db.func.substr(Post.content, 1, SNIPPET_LENGTH)),
+    'date_posted': Field(Post.date_posted, isoformat),
+    'author_id': Field(Post.user_id),
+    'author': _author(Post.user_id, 'id', 'username', 'first_name', 'last_name', 'location'),
+    'like_count': Field(Post.like_counter),
+    'comment_count': Field(Post.comment_counter),
+    'share_count': Field(Post.share_counter),
+}, default=('id', 'title', 'content', 'date_posted', 'author', 'like_count', 'comment_count'))
+
+USER_SCHEMA = Schema({
+    'id': Field(User.id),
+    'username': Field(User.username),
+    'email': Field(User.email),
+    'first_name': Field(User.first_name),
+    'last_name': Field(User.last_name),
+    'location': Field(User.location),
+    'bio': Field(User.bio),
+    'children_count': Field(User.children_count),
+    'date_joined': Field(User.date_joined, isoformat),
+    # Counted per row in the same query, from the (user_id, date_posted) index
+    'post_count': Field(
+        db.select(db.func.count(Post.id)).where(Post.user_id == User.id).scalar_subquery()
+    ),
+})
+
+COMMENT_SCHEMA = Schema({
+    'id': Field(Comment.id),
+    'content': Field(Comment.content),
+    'date_posted': Field(Comment.date_posted, isoformat),
+    'author': _author(Comment.user_id, 'id', 'username', 'first_name', 'last_name'),
+})
+
+NOTIFICATION_SCHEMA = Schema({
+    'id': Field(Notification.id),
+    'content': Field(Notification.content),
+    'timestamp': Field(Notification.timestamp, isoformat),
+    'is_read': Field(Notification.is_read),
+    'notification_type': Field(Notification.notification_type),
+    'actor_id': Field(Notification.actor_id),
+    'target_type': Field(Notification.target_type),
+    'target_id': Field(Notification.target_id),
+    'actor_count': Field(Notification.actor_count),
+    'actors': Field(Notification.actors),
+})
+
+MESSAGE_SCHEMA = Schema({
+    'id': Field(Message.id),
+    'content': Field(Message.content),
+    'timestamp': Field(Message.timestamp, isoformat),
+    'sender_id': Field(Message.sender_id),
+    'recipient_id': Field(Message.recipient_id),
+    'is_read': Field(Message.is_read),
+})
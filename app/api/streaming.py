@@ -0,0 +1,56 @@
+from flask import current_app, request, stream_with_context
+from app import db
+
+# Response types of the streaming formats selected with ?stream=
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+def stream_format():
+    """Return the streaming format requested with ?stream=, or None.
+
+    Raises ``ValueError`` for an unknown format.
+    """
+    stream = request.args.get('stream')
+    if stream and stream not in STREAM_FORMATS:
+        raise ValueError(f"Unknown stream format: {stream!r}")
+    return stream or None
+
+
+def _encode_batches(batches, fmt):
+    """Encode batches of dicts as one JSON array, or one JSON document per line"""
+    dumps = current_app.json.dumps
+    if fmt == 'ndjson':
+        for batch in batches:
+            yield ''.join(dumps(item) + '\n' for item in batch)
+        return
+
+    yield '['
+    separator = ''
+    for batch in batches:
+        if batch:
+            yield separator + ','.join(dumps(item) for item in batch)
+            separator = ','
+    yield ']'
+
+
+def stream_rows(query, serialize, fmt):
+    """Stream the rows of a select, serialized by ``serialize``, as they are read.
+
+    Rows are fetched from a server-side cursor ``API_STREAM_BATCH_SIZE`` at a
+    time and each batch is written out before the next is read, so neither
+    the rows nor the encoded response are held in memory as a whole.
+    """
+    batch_size = current_app.config['API_STREAM_BATCH_SIZE']
+
+    def batches():
+        result = db.session.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+        for rows in result.partitions():
+            yield [serialize(row) for row in rows]
+
+    return current_app.response_class(
+        stream_with_context(_encode_batches(batches(), fmt)),
+        mimetype=STREAM_FORMATS[fmt]
+    )
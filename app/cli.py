@@ -0,0 +1,128 @@
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import User
+from app.services import (backfill_feed, reconcile_counters, drain_outbox, prune_notifications,
+                          backfill_conversations, sync_all_read_flags)
+from app.compression import available_encodings, precompress_static
+
+feed_cli = AppGroup('feed', help='Maintain the materialized home feeds.')
+counters_cli = AppGroup('counters', help='Maintain the denormalized post counters.')
+static_cli = AppGroup('static', help='Prepare static files for serving.')
+notifications_cli = AppGroup('notifications', help='Deliver and maintain notifications.')
+messages_cli = AppGroup('messages', help='Maintain the conversation summaries of the inbox.')
+
+
+@feed_cli.command('backfill')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s feed.')
+def backfill(user_id):
+    """Rebuild materialized home feeds from existing posts and shares."""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+
+    for current_id in user_ids:
+        backfill_feed(current_id)
+        # One transaction per user keeps SQLite write locks short
+        db.session.commit()
+    click.echo(f"Backfilled feeds for {len(user_ids)} user(s).")
+
+
+@counters_cli.command('reconcile')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Posts per transaction.')
+@click.option('--dry-run', is_flag=True, help='Report drift without fixing it.')
+def reconcile(chunk_size, dry_run):
+    """Recompute like, share and comment counters and report drift."""
+    checked, drift = reconcile_counters(chunk_size, dry_run)
+    for post_id, attribute, stored, actual in drift:
+        click.echo(f"Post {post_id}: {attribute} was {stored}, actual {actual}")
+    action = 'Found' if dry_run else 'Fixed'
+    click.echo(f"Checked {checked} post(s). {action} {len(drift)} drifted counter(s).")
+
+
+@static_cli.command('compress')
+@click.option('--force', is_flag=True, help='Rewrite compressed copies that are already up to date.')
+def compress_static(force):
+    """Write precompressed .gz (and .br) copies of compressible static files."""
+    written = precompress_static(
+        current_app.static_folder,
+        current_app.config['COMPRESS_MIMETYPES'],
+        current_app.config['COMPRESS_MIN_SIZE'],
+        force
+    )
+    click.echo(f"Wrote {written} compressed file(s) ({', '.join(available_encodings())}).")
+
+
+@notifications_cli.command('dispatch')
+@click.option('--once', is_flag=True, help='Drain the outbox once and exit instead of running as a worker.')
+def dispatch_notifications(once):
+    """Turn queued notification outbox entries into notifications."""
+    batch_size = current_app.config['OUTBOX_BATCH_SIZE']
+    if once:
+        click.echo(f"Dispatched {drain_outbox(batch_size)} outbox entr(ies).")
+        return
+
+    interval = current_app.config['OUTBOX_POLL_INTERVAL']
+    click.echo(f"Dispatching notifications every {interval}s; press Ctrl+C to stop.")
+    while True:
+        try:
+            dispatched = drain_outbox(batch_size)
+        except OperationalError as e:
+            # Usually a write lock held by the web processes; the batch is still queued for the next poll
+            db.session.rollback()
+            click.echo(f"Outbox busy, retrying: {e.orig}")
+            dispatched = 0
+        if dispatched:
+            click.echo(f"Dispatched {dispatched} outbox entr(ies).")
+        # End the transaction so the next poll sees newly committed entries
+        db.session.remove()
+        time.sleep(interval)
+
+
+@notifications_cli.command('prune')
+@click.option('--days', type=int, default=None,
+              help='Archive read notifications older than this. Defaults to NOTIFICATION_RETENTION_DAYS.')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Notifications per transaction.')
+@click.option('--delete', is_flag=True, help='Delete old notifications instead of archiving them.')
+@click.option('--dry-run', is_flag=True, help='Report what would be reclaimed without changing anything.')
+def prune_notifications_command(days, chunk_size, delete, dry_run):
+    """Compact read notifications and archive or delete old ones."""
+    if days is None:
+        days = current_app.config['NOTIFICATION_RETENTION_DAYS']
+    report = prune_notifications(days, chunk_size, delete, dry_run)
+    prefix = '[dry run] ' if dry_run else ''
+    click.echo(f"{prefix}Compacted {report.compacted} read notification(s) into their newest group member.")
+    if delete:
+        click.echo(f"{prefix}Deleted {report.deleted} read notification(s) older than {days} day(s).")
+    else:
+        click.echo(f"{prefix}Archived {report.archived} read notification(s) older than {days} day(s).")
+    click.echo(f"{prefix}Reclaimed about {report.bytes / 1024:.1f} KiB of notification rows.")
+
+
+@messages_cli.command('backfill')
+def backfill_messages():
+    """Rebuild conversation summaries from existing messages."""
+    count = backfill_conversations()
+    db.session.commit()
+    click.echo(f"Backfilled {count} conversation(s).")
+
+
+@messages_cli.command('sync-read')
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Conversations per transaction.')
+def sync_read(chunk_size):
+    """Apply conversations' read watermarks to the messages' is_read flags."""
+    checked, updated = sync_all_read_flags(chunk_size)
+    click.echo(f"Checked {checked} conversation(s), marked {updated} message(s) as read.")
+
+
+def register_commands(app):
+    """Register the application's CLI command groups"""
+    app.cli.add_command(feed_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(static_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(messages_cli)
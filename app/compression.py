@@ -0,0 +1,215 @@
+import gzip
+import mimetypes
+import os
+import zlib
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_cache_control_header
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Request, Response
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# File suffix of each content encoding's precompressed static copy, preferred first
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def available_encodings():
+    """Return the content encodings this server can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding, encodings=None):
+    """Pick the best encoding the client accepts, or ``None`` for identity"""
+    accepted = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for encoding in encodings or available_encodings():
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    """Compress a whole body in one go"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class _StreamCompressor:
+    """Compress a streamed body chunk by chunk, flushing after each chunk"""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """WSGI middleware that compresses responses the client can decode.
+
+    Responses are compressed when their content type is in
+    ``COMPRESS_MIMETYPES`` and, if their length is known, it is at least
+    ``COMPRESS_MIN_SIZE`` bytes. Responses with a length are compressed
+    whole; streamed ones chunk by chunk, so every chunk still reaches the
+    client as soon as it is written. Requests for static files are answered
+    from precompressed ``.br``/``.gz`` siblings when those are up to date.
+    """
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.level = app.config['COMPRESS_LEVEL']
+        self.mimetypes = frozenset(app.config['COMPRESS_MIMETYPES'])
+        self.static_folder = app.static_folder
+        self.static_prefix = app.static_url_path.rstrip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if environ.get('HTTP_ACCEPT_ENCODING') and environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            static = self._precompressed_static(environ)
+            if static is not None:
+                return static(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = Headers(headers)
+            captured['exc_info'] = exc_info
+            # Headers are only sent once the first body chunk is known
+            return lambda data: None
+
+        body = self.wsgi_app(environ, capture_start_response)
+        status, headers = captured['status'], captured['headers']
+        if not self._compressible(environ, status, headers):
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return body
+        headers.add('Vary', 'Accept-Encoding')
+        if encoding is None:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return body
+
+        length = headers.get('Content-Length', type=int)
+        if length is not None and length < self.min_size:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return body
+
+        headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the original, so a strong ETag becomes weak
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+
+        if length is None:
+            headers.remove('Content-Length')
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return self._compress_stream(body, encoding)
+
+        try:
+            data = compress(b''.join(body), encoding, self.level)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        headers['Content-Length'] = str(len(data))
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return [data]
+
+    def _compressible(self, environ, status, headers):
+        """Whether a response may be compressed at all"""
+        if environ['REQUEST_METHOD'] == 'HEAD' or int(status.split(' ', 1)[0]) in (204, 206, 304):
+            return False
+        if 'Content-Encoding' in headers or 'Content-Range' in headers:
+            return False
+        if 'no-transform' in parse_cache_control_header(headers.get('Cache-Control')):
+            return False
+        mimetype = headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        return mimetype in self.mimetypes
+
+    def _compress_stream(self, body, encoding):
+        compressor = _StreamCompressor(encoding, self.level)
+        try:
+            for data in body:
+                if data:
+                    yield compressor.chunk(data)
+            yield compressor.finish()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    def _precompressed_static(self, environ):
+        """Build a response from a static file's precompressed sibling, if one is fresh"""
+        path = environ.get('PATH_INFO', '')
+        if not self.static_folder or not path.startswith(self.static_prefix):
+            return None
+        filename = safe_join(self.static_folder, path[len(self.static_prefix):])
+        if filename is None or not os.path.isfile(filename):
+            return None
+
+        request = Request(environ)
+        for candidate, suffix in PRECOMPRESSED_SUFFIXES.items():
+            compressed = filename + suffix
+            # A sibling older than its source is stale and ignored
+            if (request.accept_encodings[candidate] > 0 and os.path.isfile(compressed)
+                    and os.path.getmtime(compressed) >= os.path.getmtime(filename)):
+                break
+        else:
+            return None
+
+        stat = os.stat(compressed)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = Response(
+            wrap_file(environ, open(compressed, 'rb')),
+            mimetype=mimetype,
+            direct_passthrough=True
+        )
+        response.headers['Content-Encoding'] = candidate
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.content_length = stat.st_size
+        response.last_modified = int(stat.st_mtime)
+        response.set_etag(f'{int(stat.st_mtime)}-{stat.st_size}-{candidate}')
+        return response.make_conditional(request)
+
+
+def precompress_static(static_folder, mimetypes_allowed, min_size, force=False):
+    """Write .gz (and, with brotli installed, .br) siblings for static files.
+
+    Only files of a compressible type and at least ``min_size`` bytes are
+    compressed, and existing siblings are rewritten only when the source is
+    newer or ``force`` is set. Returns the number of files written.
+    """
+    written = 0
+    suffixes = tuple(PRECOMPRESSED_SUFFIXES.values())
+    for directory, _, filenames in os.walk(static_folder):
+        for name in filenames:
+            if name.endswith(suffixes):
+                continue
+            path = os.path.join(directory, name)
+            if mimetypes.guess_type(path)[0] not in mimetypes_allowed or os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as source:
+                data = source.read()
+            for encoding in available_encodings():
+                target = path + PRECOMPRESSED_SUFFIXES[encoding]
+                if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                with open(target, 'wb') as output:
+                    output.write(compress(data, encoding, 9 if encoding == 'gzip' else 11))
+                written += 1
+    return written
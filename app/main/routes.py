@@ -1,105 +1,50 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, current_app
+from flask import render_template, redirect, url_for, flash, request, jsonify, current_app, abort
 from flask_login import login_user, current_user, logout_user, login_required
 from app import db
 from app.main import main
 from app.models import User, Post, Comment, Message, Notification, PostLike, PostShare, CommentReaction, Friendship, Media
 from app.forms import RegistrationForm, LoginForm, PostForm, CommentForm, MessageForm, EditProfileForm
+from app.services import (load_timeline, cached_home_feed, fan_out_post, fan_out_share, retract_share,
+                          connect_feeds, invalidate_feeds, invalidate_friend_feeds, load_engagement, adjust_counters,
+                          FeedPage, public_feed_page, get_public_feed, with_profile, touch_post, touch_user,
+                          post_version, conditional_page, publish_events, current_watermark, decode_watermark,
+                          event_stream, load_thread, mark_thread_read, read_watermarks, load_inbox, record_message, invalidate_unread, load_notifications,
+                          mark_notifications_read, queue_notification, queue_retraction, wake_dispatcher)
 from datetime import datetime
 import os
 import uuid
 from werkzeug.utils import secure_filename
 
-def get_all_posts_ordered():
-    """Get all posts (original and shared) ordered by date"""
+def get_home_timeline(cursor, per_page):
+    """Get one page of the home feed (original and shared posts) after a cursor"""
     if not current_user.is_authenticated:
         # For non-authenticated users, show only original posts
-        original_posts = Post.query.all()
-        return sorted(original_posts, key=lambda x: x.date_posted, reverse=True)
+        return load_timeline(include_shares=False, limit=per_page, cursor=cursor)
     
-    # Get original posts from friends and self
-    # First get all friends (both directions)
-    friendships = Friendship.query.filter(
-        db.or_(
-            Friendship.user_id == current_user.id,
-            Friendship.friend_id == current_user.id
-        )
-    ).filter(Friendship.status == 'accepted').all()
-    
-    # Get friend user IDs
-    friend_ids = []
-    for friendship in friendships:
-        if friendship.user_id == current_user.id:
-            friend_ids.append(friendship.friend_id)
-        else:
-            friend_ids.append(friendship.user_id)
-    
-    # Always include self
-    friend_ids.append(current_user.id)
-    
-    # Get original posts from friends and self
-    original_posts = Post.query.filter(Post.user_id.in_(friend_ids)).all()
-    
-    # Get shared posts from friends and self
-    shared_posts = []
-    post_shares = PostShare.query.filter(PostShare.user_id.in_(friend_ids)).all()
-    
-    for share in post_shares:
-        # Create a pseudo post object for the shared post
-        shared_post = type('Post', (object,), {
-            'id': share.post.id,
-            'title': share.post.title,
-            'content': share.share_content if share.share_content else share.post.content,
-            'date_posted': share.shared_at,
-            'author': share.user,  # The user who shared it
-            'original_author': share.post.author,  # The original author
-            'media_files': share.post.media_files,
-            'comments': share.post.comments,
-            'likes': share.post.likes,
-            'like_count': share.post.like_count,
-            'share_count': share.post.share_count,
-            'is_shared': True,
-            'original_post': share.post
-        })
-        shared_posts.append(shared_post)
-    
-    # Combine and sort all posts by date
-    all_posts = original_posts + shared_posts
-    all_posts.sort(key=lambda x: x.date_posted, reverse=True)
-    
-    return all_posts
+    # Posts and shares from friends and self, from the cached materialized feed
+    return cached_home_feed(current_user.id, limit=per_page, cursor=cursor)
 
 @main.route("/")
 @main.route("/home")
 def home():
-    # Get all posts ordered by date
-    page = request.args.get('page', 1, type=int)
-    all_posts = get_all_posts_ordered()
-    
-    # Manual pagination
-    per_page = 5
-    total = len(all_posts)
-    pages = (total + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < pages
-    prev_num = page - 1 if has_prev else None
-    next_num = page + 1 if has_next else None
-    
-    # Get posts for current page
-    start = (page - 1) * per_page
-    end = start + per_page
-    posts_for_page = all_posts[start:end]
-    
-    # Create a pagination-like object
-    from collections import namedtuple
-    Pagination = namedtuple('Pagination', ['items', 'page', 'pages', 'has_prev', 'has_next', 'prev_num', 'next_num'])
-    posts = Pagination(posts_for_page, page, pages, has_prev, has_next, prev_num, next_num)
-    
-    # Check if request is AJAX for infinite scroll
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        # Return only the posts for AJAX requests
-        return render_template('home_posts.html', posts=posts)
-    
-    return render_template('home.html', posts=posts)
+    # Get the page of posts after the cursor, seeking on (date_posted, id) in the database
+    cursor = request.args.get('cursor')
+    per_page = current_app.config['FEED_PAGE_SIZE']
+    template = 'home_posts.html' if request.headers.get('X-Requested-With') == 'XMLHttpRequest' else 'home.html'
+    try:
+        # Logged-out visitors share one precomputed feed; only pages past its head reach the database
+        if not current_user.is_authenticated:
+            cached = public_feed_page(cursor)
+            if cached is not None:
+                cards, next_cursor = cached
+                return render_template(template, posts=FeedPage([], next_cursor), cards=cards)
+        posts = get_home_timeline(cursor, per_page)
+    except ValueError:
+        abort(400)
+    load_engagement(posts.items)
+    
+    # AJAX requests for infinite scroll get only the posts
+    return render_template(template, posts=posts)
 
 @main.route("/register", methods=['GET', 'POST'])
 def register():
@@ -181,63 +126,15 @@ def logout():
 @main.route("/profile/<username>")
 def profile(username):
     user = User.query.filter_by(username=username).first_or_404()
-    page = request.args.get('page', 1, type=int)
-    
-    # Get original posts by this user
-    original_posts = Post.query.filter(Post.user_id == user.id).order_by(Post.date_posted.desc())
-    
-    # Get posts shared by this user
-    shared_posts_query = db.session.query(Post).join(PostShare).filter(PostShare.user_id == user.id)
-    
-    # Combine original and shared posts
-    # Note: We need to execute the queries to combine them properly
-    all_original_posts = original_posts.all()
-    
-    # For shared posts, we need to create pseudo post objects
-    shared_posts = []
-    post_shares = PostShare.query.filter(PostShare.user_id == user.id).all()
-    
-    for share in post_shares:
-        # Create a pseudo post object for the shared post
-        shared_post = type('Post', (object,), {
-            'id': share.post.id,
-            'title': share.post.title,
-            'content': share.share_content if share.share_content else share.post.content,
-            'date_posted': share.shared_at,
-            'author': share.user,  # The user who shared it
-            'original_author': share.post.author,  # The original author
-            'media_files': share.post.media_files,
-            'comments': share.post.comments,
-            'likes': share.post.likes,
-            'like_count': share.post.like_count,
-            'share_count': share.post.share_count,
-            'is_shared': True,
-            'original_post': share.post
-        })
-        shared_posts.append(shared_post)
-    
-    # Combine and sort all posts by date
-    all_posts = all_original_posts + shared_posts
-    all_posts.sort(key=lambda x: x.date_posted, reverse=True)
-    
-    # Manual pagination for combined posts
-    per_page = 5
-    total = len(all_posts)
-    pages = (total + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < pages
-    prev_num = page - 1 if has_prev else None
-    next_num = page + 1 if has_next else None
-    
-    # Get posts for current page
-    start = (page - 1) * per_page
-    end = start + per_page
-    posts_for_page = all_posts[start:end]
-    
-    # Create a pagination-like object
-    from collections import namedtuple
-    Pagination = namedtuple('Pagination', ['items', 'page', 'pages', 'has_prev', 'has_next', 'prev_num', 'next_num'])
-    posts = Pagination(posts_for_page, page, pages, has_prev, has_next, prev_num, next_num)
+    cursor = request.args.get('cursor')
+    
+    # Get this user's original and shared posts after the cursor, ordered by date in the database
+    per_page = current_app.config['FEED_PAGE_SIZE']
+    try:
+        posts = load_timeline([user.id], limit=per_page, cursor=cursor)
+    except ValueError:
+        abort(400)
+    load_engagement(posts.items)
     
     return render_template('profile.html', user=user, posts=posts)
 
@@ -277,6 +174,8 @@ def edit_profile():
                 current_user.profile_image = f'uploads/{current_user.id}/{unique_filename}'
         
         db.session.commit()
+        # Cards in the shared logged-out feed show the author's name and location
+        get_public_feed().clear()
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('main.profile', username=current_user.username))
     elif request.method == 'GET':
@@ -341,7 +240,13 @@ def new_post():
                 )
                 db.session.add(media_record)
         
+        # Write the post into the author's and friends' feeds in the same transaction
+        fan_out_post(post)
+        # The author's post count is part of their version stamp
+        touch_user(current_user.id)
         db.session.commit()
+        invalidate_friend_feeds(current_user.id)
+        get_public_feed().add_post(post)
         flash('Your post has been created!', 'success')
         return redirect(url_for('main.home'))
     
@@ -349,10 +254,18 @@ def new_post():
 
 @main.route("/post/<int:post_id>")
 def post(post_id):
-    post = Post.query.get_or_404(post_id)
-    form = CommentForm()
-    comments = Comment.query.filter_by(post_id=post.id, parent_id=None).order_by(Comment.date_posted.desc()).all()
-    return render_template('post.html', title=post.title, post=post, form=form, comments=comments)
+    # Check the client's cached copy against cheap version stamps before loading anything
+    stamps = post_version(post_id, current_user.id if current_user.is_authenticated else None)
+    if stamps is None:
+        abort(404)
+    
+    def render():
+        post = with_profile(Post.query, 'post_detail').get_or_404(post_id)
+        form = CommentForm()
+        comments = with_profile(Comment.query, 'comment_thread').filter_by(post_id=post.id, parent_id=None).order_by(Comment.date_posted.desc()).all()
+        return render_template('post.html', title=post.title, post=post, form=form, comments=comments)
+    
+    return conditional_page(stamps, render)
 
 @main.route("/post/<int:post_id>/comment", methods=['POST'])
 @login_required
@@ -400,18 +313,12 @@ def comment_post(post_id):
                 db.session.add(media_record)
         
         db.session.add(comment)
+        adjust_counters(post.id, comments=1)
+        # Notify the post author in the same transaction; the dispatcher coalesces it per post
+        queue_notification(post.author.id, current_user, 'comment', target_type='post', target_id=post.id,
+                           post_id=post.id)
         db.session.commit()
-        
-        # Create notification for post author (if not the commenter)
-        if post.author.id != current_user.id:
-            notification = Notification(
-                content=f"{current_user.first_name} {current_user.last_name} commented on your post",
-                user=post.author,
-                post_id=post.id,
-                notification_type='comment'
-            )
-            db.session.add(notification)
-            db.session.commit()
+        wake_dispatcher()
         
         flash('Your comment has been added!', 'success')
     return redirect(url_for('main.post', post_id=post.id))
@@ -427,64 +334,37 @@ def like_post(post_id):
     if like:
         # Unlike the post
         db.session.delete(like)
+        adjust_counters(post.id, likes=-1)
+        # Take the like back out of the author's notification
+        queue_retraction(post.author.id, current_user, 'like', 'post', post.id)
         db.session.commit()
-        # Remove notification if it exists
-        notification = Notification.query.filter_by(
-            user_id=post.author.id,
-            content=f"{current_user.first_name} {current_user.last_name} liked your post"
-        ).first()
-        if notification:
-            db.session.delete(notification)
-            db.session.commit()
     else:
         # Like the post
         like = PostLike(user_id=current_user.id, post_id=post.id)
         db.session.add(like)
+        adjust_counters(post.id, likes=1)
+        # Notify the post author in the same transaction; the dispatcher coalesces it per post
+        queue_notification(post.author.id, current_user, 'like', target_type='post', target_id=post.id,
+                           post_id=post.id)
         db.session.commit()
-        
-        # Create notification for post author (if not the liker)
-        if post.author.id != current_user.id:
-            notification = Notification(
-                content=f"{current_user.first_name} {current_user.last_name} liked your post",
-                user=post.author,
-                post_id=post.id,
-                notification_type='like'
-            )
-            db.session.add(notification)
-            db.session.commit()
+    wake_dispatcher()
     
     return jsonify({'likes': post.like_count()})
 
 @main.route("/messages")
 @login_required
 def messages():
-    # Get conversations with other users
-    sent_messages = Message.query.filter_by(sender_id=current_user.id).all()
-    received_messages = Message.query.filter_by(recipient_id=current_user.id).all()
-    
-    # Combine and sort messages
-    all_messages = sent_messages + received_messages
-    all_messages.sort(key=lambda x: x.timestamp, reverse=True)
-    
-    # Get unique users that the current user has messaged or been messaged by
-    user_ids = set()
-    for message in all_messages:
-        if message.sender_id != current_user.id:
-            user_ids.add(message.sender_id)
-        if message.recipient_id != current_user.id:
-            user_ids.add(message.recipient_id)
-    
-    users = User.query.filter(User.id.in_(user_ids)).all()
-    
-    # Add unread message count for each user
-    for user in users:
-        user.unread_count = Message.query.filter_by(
-            sender_id=user.id,
-            recipient_id=current_user.id,
-            is_read=False
-        ).count()
+    # Get the most recently active page of conversations, with their partners and unread counts, in one query
+    try:
+        page = load_inbox(
+            current_user.id,
+            current_app.config['INBOX_PAGE_SIZE'],
+            request.args.get('before', type=int)
+        )
+    except ValueError:
+        abort(400)
     
-    return render_template('messages.html', users=users)
+    return render_template('messages.html', conversations=page.conversations, older=page.before)
 
 @main.route("/messages/<int:user_id>", methods=['GET', 'POST'])
 @login_required
@@ -499,54 +379,82 @@ def send_message(user_id):
             recipient=recipient
         )
         db.session.add(message)
+        db.session.flush()  # Get the message ID for the conversation and the notification's target
+        record_message(message)
+        # Notify the recipient in the same transaction
+        queue_notification(recipient.id, current_user, 'message',
+                           content=f"{current_user.first_name} {current_user.last_name} sent you a message",
+                           target_type='message', target_id=message.id)
         db.session.commit()
-        
-        # Create notification for recipient
-        notification = Notification(
-            content=f"{current_user.first_name} {current_user.last_name} sent you a message",
-            user=recipient,
-            notification_type='message'
-        )
-        db.session.add(notification)
-        db.session.commit()
+        # The message itself is already committed: update the recipient's badge and streams now
+        invalidate_unread(recipient.id)
+        publish_events(recipient.id)
+        wake_dispatcher()
         
         flash('Your message has been sent!', 'success')
         return redirect(url_for('main.send_message', user_id=user_id))
     
-    # Get message history
-    messages = Message.query.filter(
-        db.or_(
-            db.and_(Message.sender_id == current_user.id, Message.recipient_id == user_id),
-            db.and_(Message.sender_id == user_id, Message.recipient_id == current_user.id)
+    # Get the newest page of the conversation, or the one before ?before=<message_id>
+    try:
+        page = load_thread(
+            (Message.sender_id, Message.content),
+            current_user.id, recipient.id,
+            current_app.config['MESSAGE_PAGE_SIZE'],
+            request.args.get('before', type=int)
         )
-    ).order_by(Message.timestamp.asc()).all()
+    except ValueError:
+        abort(400)
     
-    # Mark received messages as read
-    for message in messages:
-        if message.recipient_id == current_user.id and not message.is_read:
-            message.is_read = True
-    db.session.commit()
+    # Read receipts: messages up to the recipient's watermark have been read
+    _, read_up_to = read_watermarks(current_user.id, recipient.id)
     
-    # Get unread count for this conversation
-    unread_count = Message.query.filter_by(
-        sender_id=user_id,
-        recipient_id=current_user.id,
-        is_read=False
-    ).count()
+    # Mark received messages as read by moving the watermark, if anything was unread
+    if mark_thread_read(current_user.id, recipient.id):
+        db.session.commit()
+        invalidate_unread(current_user.id)
     
-    return render_template('send_message.html', title='Send Message', form=form, recipient=recipient, messages=messages, unread_count=unread_count)
+    return render_template('send_message.html', title='Send Message', form=form, recipient=recipient, messages=page.messages, older=page.before, read_up_to=read_up_to)
 
 @main.route("/notifications")
 @login_required
 def notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.timestamp.desc()).all()
+    # Get the newest page of notifications, or the one after ?before=<notification_id>
+    before = request.args.get('before', type=int)
+    try:
+        page = load_notifications(
+            (Notification.user_id, Notification.content, Notification.notification_type, Notification.is_read),
+            current_user.id,
+            current_app.config['NOTIFICATION_PAGE_SIZE'],
+            before
+        )
+    except ValueError:
+        abort(400)
     
-    # Mark all as read
-    for notification in notifications:
-        notification.is_read = True
-    db.session.commit()
+    # Mark all as read, up to the newest one shown, once the first page has been read
+    if before is None and page.notifications:
+        mark_notifications_read(current_user.id, page.notifications[0].timestamp)
+        db.session.commit()
+        invalidate_unread(current_user.id)
     
-    return render_template('notifications.html', notifications=notifications)
+    return render_template('notifications.html', notifications=page.notifications, older=page.before)
+
+@main.route("/events")
+@login_required
+def events():
+    # Resume after the client's last event, or start from now on a fresh connection
+    try:
+        watermark = decode_watermark(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        watermark = current_watermark(current_user.id)
+    
+    # The stream outlives the request, so it gets the app and user id rather than the request context
+    response = current_app.response_class(
+        event_stream(current_app._get_current_object(), current_user.id, watermark),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @main.route("/post/<int:post_id>/share", methods=['POST'])
 @login_required
@@ -558,16 +466,13 @@ def share_post(post_id):
     
     if existing_share:
         # Remove share (unshare)
+        retract_share(existing_share)
         db.session.delete(existing_share)
+        adjust_counters(post.id, shares=-1)
+        # Take the share back out of the author's notification
+        queue_retraction(post.author.id, current_user, 'share', 'post', post.id)
         db.session.commit()
-        # Remove notification if it exists
-        notification = Notification.query.filter_by(
-            user_id=post.author.id,
-            content=f"{current_user.first_name} {current_user.last_name} shared your post"
-        ).first()
-        if notification:
-            db.session.delete(notification)
-            db.session.commit()
+        invalidate_friend_feeds(current_user.id)
     else:
         # Create new share
         share_content = request.form.get('share_content', '')
@@ -577,18 +482,15 @@ def share_post(post_id):
             share_content=share_content
         )
         db.session.add(share)
+        db.session.flush()  # Get share ID and date for the feeds
+        fan_out_share(share)
+        adjust_counters(post.id, shares=1)
+        # Notify the post author in the same transaction; the dispatcher coalesces it per post
+        queue_notification(post.author.id, current_user, 'share', target_type='post', target_id=post.id,
+                           post_id=post.id)
         db.session.commit()
-        
-        # Create notification for post author (if not the sharer)
-        if post.author.id != current_user.id:
-            notification = Notification(
-                content=f"{current_user.first_name} {current_user.last_name} shared your post",
-                user=post.author,
-                post_id=post.id,
-                notification_type='share'
-            )
-            db.session.add(notification)
-            db.session.commit()
+        invalidate_friend_feeds(current_user.id)
+    wake_dispatcher()
     
     return jsonify({'shares': post.share_count()})
 
@@ -615,16 +517,11 @@ def add_friend(user_id):
         status='pending'
     )
     db.session.add(friendship)
+    # Notify the user in the same transaction
+    queue_notification(user.id, current_user, 'friend_request',
+                       content=f"{current_user.first_name} {current_user.last_name} wants to be your friend")
     db.session.commit()
-    
-    # Create notification for the user
-    notification = Notification(
-        content=f"{current_user.first_name} {current_user.last_name} wants to be your friend",
-        user=user,
-        notification_type='friend_request'
-    )
-    db.session.add(notification)
-    db.session.commit()
+    wake_dispatcher()
     
     return jsonify({'message': 'Friend request sent successfully'})
 
@@ -642,16 +539,13 @@ def accept_friend(user_id):
     
     # Accept the friendship
     friendship.status = 'accepted'
+    connect_feeds(user.id, current_user.id)
+    # Notify the user in the same transaction
+    queue_notification(user.id, current_user, 'friend_accepted',
+                       content=f"{current_user.first_name} {current_user.last_name} accepted your friend request")
     db.session.commit()
-    
-    # Create notification for the user
-    notification = Notification(
-        content=f"{current_user.first_name} {current_user.last_name} accepted your friend request",
-        user=user,
-        notification_type='friend_accepted'
-    )
-    db.session.add(notification)
-    db.session.commit()
+    invalidate_feeds(user.id, current_user.id)
+    wake_dispatcher()
     
     return jsonify({'message': 'Friend request accepted'})
 
@@ -669,16 +563,12 @@ def reject_friend(user_id):
     
     # Delete the friendship request
     db.session.delete(friendship)
+    # Notify the user in the same transaction
+    queue_notification(user.id, current_user, 'friend_rejected',
+                       content=f"{current_user.first_name} {current_user.last_name} rejected your friend request")
     db.session.commit()
-    
-    # Create notification for the user
-    notification = Notification(
-        content=f"{current_user.first_name} {current_user.last_name} rejected your friend request",
-        user=user,
-        notification_type='friend_rejected'
-    )
-    db.session.add(notification)
-    db.session.commit()
+    invalidate_feeds(user.id, current_user.id)
+    wake_dispatcher()
     
     return jsonify({'message': 'Friend request rejected'})
 
@@ -700,18 +590,13 @@ def reply_to_comment(comment_id):
         parent_id=parent_comment.id
     )
     db.session.add(reply)
+    adjust_counters(parent_comment.post_id, comments=1)
+    # Notify the parent comment's author in the same transaction
+    queue_notification(parent_comment.author.id, current_user, 'comment_reply',
+                       content=f"{current_user.first_name} {current_user.last_name} replied to your comment",
+                       target_type='comment', target_id=parent_comment.id, post_id=parent_comment.post_id)
     db.session.commit()
-    
-    # Create notification for parent comment author (if not the replier)
-    if parent_comment.author.id != current_user.id:
-        notification = Notification(
-            content=f"{current_user.first_name} {current_user.last_name} replied to your comment",
-            user=parent_comment.author,
-            post_id=parent_comment.post_id,
-            notification_type='comment_reply'
-        )
-        db.session.add(notification)
-        db.session.commit()
+    wake_dispatcher()
     
     flash('Your reply has been added!', 'success')
     return redirect(url_for('main.post', post_id=parent_comment.post_id))
@@ -733,10 +618,14 @@ def react_to_comment(comment_id):
         comment_id=comment.id
     ).first()
     
+    # Reaction counts are shown on the post page
+    touch_post(comment.post_id)
+    
     # If user already has a reaction and it's the same as the new one, remove it
     if existing_reaction and existing_reaction.reaction_type == reaction_type:
         # Remove reaction
         db.session.delete(existing_reaction)
+        queue_retraction(comment.author.id, current_user, 'comment_reaction', 'comment', comment.id)
         db.session.commit()
         action = 'removed'
     else:
@@ -751,18 +640,12 @@ def react_to_comment(comment_id):
             reaction_type=reaction_type
         )
         db.session.add(reaction)
+        # Notify the comment author in the same transaction; the dispatcher coalesces it per comment
+        queue_notification(comment.author.id, current_user, 'comment_reaction', target_type='comment',
+                           target_id=comment.id, post_id=comment.post_id)
         db.session.commit()
         action = 'added'
-        
-        # Create notification for comment author (if not the reactor)
-        if comment.author.id != current_user.id:
-            notification = Notification(
-                content=f"{current_user.first_name} {current_user.last_name} reacted to your comment",
-                user=comment.author,
-                notification_type='comment_reaction'
-            )
-            db.session.add(notification)
-            db.session.commit()
+    wake_dispatcher()
     
     # Count reactions for this comment
     reaction_counts = {}
@@ -788,7 +671,8 @@ def search():
                 User.last_name.contains(query)
             )
         ).all()
-        posts = Post.query.filter(Post.content.contains(query)).order_by(Post.date_posted.desc()).all()
+        posts = with_profile(Post.query, 'post_summary').filter(Post.content.contains(query)).order_by(Post.date_posted.desc()).all()
+        load_engagement(posts)
     else:
         users = []
         posts = []
@@ -2,8 +2,13 @@ from .user import User
 from .post import Post, PostLike
 from .comment import Comment
 from .message import Message
+from .conversation import Conversation
 from .notification import Notification
+from .notification_actor import NotificationActor
+from .notification_outbox import NotificationOutbox
+from .notification_archive import NotificationArchive
 from .post_share import PostShare
 from .comment_reaction import CommentReaction
 from .friendship import Friendship
-from .media import Media
\ No newline at end of file
+from .media import Media
+from .feed_entry import FeedEntry
\ No newline at end of file
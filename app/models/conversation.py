@@ -0,0 +1,25 @@
+from app import db
+
+class Conversation(db.Model):
+    # One row per pair of users who have exchanged messages, kept up to date by send_message
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # the smaller user id of the pair
+    user_high_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # the larger one
+    last_message_id = db.Column(db.Integer, db.ForeignKey('message.id'), nullable=True)
+    preview = db.Column(db.String(140), nullable=False, default='')  # start of the last message
+    last_activity = db.Column(db.DateTime, nullable=False)  # when the last message was sent
+    low_unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # unread by user_low
+    high_unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # unread by user_high
+    # Read watermarks: the newest message each side has read; older messages to them are read too
+    low_last_read_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    high_last_read_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id'),
+        # Each side of the inbox is a range scan on one of these indexes
+        db.Index('ix_conversation_user_low_id_last_activity', 'user_low_id', 'last_activity', 'id'),
+        db.Index('ix_conversation_user_high_id_last_activity', 'user_high_id', 'last_activity', 'id'),
+    )
+    
+    def __repr__(self):
+        return f"Conversation('{self.user_low_id}', '{self.user_high_id}', '{self.last_activity}')"
@@ -0,0 +1,22 @@
+from app import db
+
+class FeedEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    viewer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.Integer, nullable=False)  # 0 = post, 1 = share
+    item_id = db.Column(db.Integer, nullable=False)  # post id or share id, depending on kind
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # author or sharer
+    created_at = db.Column(db.DateTime, nullable=False)  # date posted or date shared
+    
+    __table_args__ = (
+        db.UniqueConstraint('viewer_id', 'kind', 'item_id'),
+        # The home feed is a range scan on this index
+        db.Index('ix_feed_entry_viewer_id_created_at', 'viewer_id', 'created_at', 'kind', 'item_id'),
+        # Retraction when a share or friendship goes away
+        db.Index('ix_feed_entry_kind_item_id', 'kind', 'item_id'),
+        db.Index('ix_feed_entry_actor_id_viewer_id', 'actor_id', 'viewer_id'),
+    )
+    
+    def __repr__(self):
+        return f"FeedEntry('{self.viewer_id}', '{self.kind}', '{self.item_id}')"
@@ -12,5 +12,11 @@ class Friendship(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], backref=db.backref('friendships', lazy=True))
     friend = db.relationship('User', foreign_keys=[friend_id], backref=db.backref('friend_of', lazy=True))
     
+    # Friend lookups go through either side of the pair
+    __table_args__ = (
+        db.Index('ix_friendship_user_id_status', 'user_id', 'status'),
+        db.Index('ix_friendship_friend_id_status', 'friend_id', 'status'),
+    )
+    
     def __repr__(self):
         return f"Friendship('{self.user.username}', '{self.friend.username}', '{self.status}')"
\ No newline at end of file
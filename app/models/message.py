@@ -13,5 +13,12 @@ class Message(db.Model):
     sender = db.relationship('User', foreign_keys=[sender_id], back_populates='sent_messages')
     recipient = db.relationship('User', foreign_keys=[recipient_id], back_populates='received_messages')
     
+    __table_args__ = (
+        # Each direction of a thread is a range scan on this index
+        db.Index('ix_message_sender_id_recipient_id_timestamp', 'sender_id', 'recipient_id', 'timestamp', 'id'),
+        # Unread counters
+        db.Index('ix_message_recipient_id_is_read', 'recipient_id', 'is_read'),
+    )
+    
     def __repr__(self):
         return f"Message('{self.content[:20]}...', '{self.timestamp}')"
\ No newline at end of file
@@ -9,9 +9,28 @@ class Notification(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=True)  # Reference to the post that triggered the notification
     is_read = db.Column(db.Boolean, default=False)
     notification_type = db.Column(db.String(50), nullable=False)  # like, comment, follow, etc.
+    # Who acted (the most recent actor of a coalesced notification) and on what
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    target_type = db.Column(db.String(20), nullable=True)  # post, comment or message
+    target_id = db.Column(db.Integer, nullable=True)
+    # Coalesced notifications: how many actors, and the most recent of them as [{id, name}]
+    actor_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    actors = db.Column(db.JSON, nullable=True)
     
     # Relationship
     post = db.relationship('Post', backref=db.backref('notifications', lazy=True))
+    counted_actors = db.relationship('NotificationActor', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        # Unread counters
+        db.Index('ix_notification_user_id_is_read', 'user_id', 'is_read'),
+        # The notification center is a range scan on this index
+        db.Index('ix_notification_user_id_timestamp', 'user_id', 'timestamp', 'id'),
+        # Finding the notification to coalesce into or retract from
+        db.Index('ix_notification_user_id_target', 'user_id', 'notification_type', 'target_type', 'target_id'),
+        # Notifications by actor and target
+        db.Index('ix_notification_actor_id_target', 'actor_id', 'target_type', 'target_id'),
+    )
     
     def __repr__(self):
         return f"Notification('{self.content[:20]}...', '{self.timestamp}')"
\ No newline at end of file
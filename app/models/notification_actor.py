@@ -0,0 +1,9 @@
+from app import db
+
+class NotificationActor(db.Model):
+    # Every actor counted on a coalesced notification, not just the few named in Notification.actors
+    notification_id = db.Column(db.Integer, db.ForeignKey('notification.id', ondelete='CASCADE'), primary_key=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    
+    def __repr__(self):
+        return f"NotificationActor('{self.notification_id}', '{self.actor_id}')"
@@ -0,0 +1,25 @@
+from datetime import datetime
+from app import db
+
+class NotificationArchive(db.Model):
+    # Read notifications moved out of the notification table by `flask notifications prune`
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # the notification's original id
+    content = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    post_id = db.Column(db.Integer, nullable=True)
+    is_read = db.Column(db.Boolean, default=True)
+    notification_type = db.Column(db.String(50), nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    target_type = db.Column(db.String(20), nullable=True)
+    target_id = db.Column(db.Integer, nullable=True)
+    actor_count = db.Column(db.Integer, nullable=False, default=1)
+    actors = db.Column(db.JSON, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_notification_archive_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+    
+    def __repr__(self):
+        return f"NotificationArchive('{self.content[:20]}...', '{self.timestamp}')"
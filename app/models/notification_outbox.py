@@ -0,0 +1,17 @@
+from datetime import datetime
+from app import db
+
+class NotificationOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(20), nullable=False)  # notify or retract
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # recipient
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    notification_type = db.Column(db.String(50), nullable=False)
+    content = db.Column(db.Text, nullable=True)  # rendered when queued; coalesced types render their own
+    target_type = db.Column(db.String(20), nullable=True)  # post, comment or message
+    target_id = db.Column(db.Integer, nullable=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"NotificationOutbox('{self.action}', '{self.notification_type}', '{self.user_id}')"
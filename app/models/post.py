@@ -10,19 +10,36 @@ class Post(db.Model):
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Denormalized engagement counters, kept up to date with SQL increments
+    like_counter = db.Column('like_count', db.Integer, nullable=False, default=0, server_default='0')
+    share_counter = db.Column('share_count', db.Integer, nullable=False, default=0, server_default='0')
+    comment_counter = db.Column('comment_count', db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Version stamp for conditional GETs; bumped by any change to the post, its counters or its comments
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
     # Relationships
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('PostLike', backref='post', lazy=True, cascade='all, delete-orphan')
     media_files = db.relationship('Media', back_populates='post', lazy=True, cascade='all, delete-orphan')
     
+    # Keyset pagination seeks on (date_posted, id), per author and globally
+    __table_args__ = (
+        db.Index('ix_post_user_id_date_posted', 'user_id', 'date_posted', 'id'),
+        db.Index('ix_post_date_posted', 'date_posted', 'id'),
+    )
+    
     def __repr__(self):
         return f"Post('{self.title}', '{self.date_posted}')"
     
     def like_count(self):
-        return PostLike.query.filter_by(post_id=self.id).count()
+        return self.like_counter or 0
     
     def share_count(self):
-        return PostShare.query.filter_by(post_id=self.id).count()
+        return self.share_counter or 0
+    
+    def comment_count(self):
+        return self.comment_counter or 0
 
 class PostLike(db.Model):
     id = db.Column(db.Integer, primary_key=True)
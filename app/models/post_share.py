@@ -12,5 +12,10 @@ class PostShare(db.Model):
     post = db.relationship('Post', backref=db.backref('shares', lazy=True))
     user = db.relationship('User', backref=db.backref('shared_posts', lazy=True))
     
+    # Keyset pagination seeks on (shared_at, id) per sharer
+    __table_args__ = (
+        db.Index('ix_post_share_user_id_shared_at', 'user_id', 'shared_at', 'id'),
+    )
+    
     def __repr__(self):
         return f"PostShare('{self.user.username}', '{self.post.id}', '{self.shared_at}')"
\ No newline at end of file
@@ -18,13 +18,15 @@ class User(db.Model, UserMixin):
     children_count = db.Column(db.Integer, default=0)
     partners_count = db.Column(db.Integer, default=0)
     date_joined = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Version stamp for conditional GETs; bumped by profile edits and new posts
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
     comments = db.relationship('Comment', backref='author', lazy=True, cascade='all, delete-orphan')
     sent_messages = db.relationship('Message', foreign_keys='Message.sender_id', back_populates='sender', lazy=True)
     received_messages = db.relationship('Message', foreign_keys='Message.recipient_id', back_populates='recipient', lazy=True)
-    notifications = db.relationship('Notification', backref='user', lazy=True, cascade='all, delete-orphan')
+    notifications = db.relationship('Notification', foreign_keys='Notification.user_id', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f"User('{self.username}', '{self.email}', '{self.first_name} {self.last_name}')"
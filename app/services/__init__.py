@@ -0,0 +1,24 @@
+from .feed_item import FeedItem, resolve_feed_items
+from .timeline import (FeedPage, encode_cursor, decode_cursor, friend_ids_query, feed_author_ids, timeline_query,
+                       load_timeline, posts_query)
+from .fanout import fan_out_post, fan_out_share, retract_share, connect_feeds, disconnect_feeds, backfill_feed, load_home_feed
+from .cache import LRUCache
+from .feed_cache import init_feed_cache, get_feed_cache, cached_home_feed, invalidate_feeds, invalidate_friend_feeds
+from .engagement import PostEngagement, EngagementLoader, get_engagement_loader, load_engagement, post_engagement
+from .counters import adjust_counters, reconcile_counters
+from .public_feed import PublicFeed, init_public_feed, get_public_feed, public_feed_page
+from .loading import LOADING_PROFILES, loading_options, with_profile
+from .versions import (touch_post, touch_user, post_version, user_version, conditional_response,
+                       conditional_page)
+from .events import (EventBroker, init_event_broker, get_event_broker, publish_events, current_watermark,
+                     decode_watermark, event_stream)
+from .conversations import (InboxPage, conversation_pair, record_message, mark_conversation_read, read_watermarks,
+                            inbox_query, load_inbox, backfill_conversations)
+from .threads import (ThreadPage, thread_filter, thread_query, load_thread, mark_thread_read, sync_read_flags,
+                      sync_all_read_flags)
+from .unread import UnreadCounts, init_unread_cache, get_unread_cache, unread_counts, invalidate_unread
+from .notifications import (NotificationPage, notifications_query, load_notifications, mark_notifications_read,
+                            coalesce_notification, retract_notification)
+from .outbox import (queue_notification, queue_retraction, dispatch_outbox, drain_outbox, OutboxDispatcher,
+                     init_outbox_dispatcher, start_outbox_dispatcher, wake_dispatcher)
+from .retention import PruneReport, compact_notifications, archive_notifications, prune_notifications
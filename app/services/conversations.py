@@ -0,0 +1,209 @@
+from collections import namedtuple
+from app import db
+from app.models import User, Message, Conversation
+
+# One page of a user's inbox, most recently active first, and the ``before`` id of the page after it
+InboxPage = namedtuple('InboxPage', ['conversations', 'before'])
+
+# Characters of the last message kept as a conversation's preview
+PREVIEW_LENGTH = 140
+
+
+def conversation_pair(user_id, other_id):
+    """Return the (user_low_id, user_high_id) key of two users' conversation"""
+    return min(user_id, other_id), max(user_id, other_id)
+
+
+def _side_columns(user_id, other_id):
+    """Return the unread count and read watermark columns of ``user_id``'s side of their conversation"""
+    low, _ = conversation_pair(user_id, other_id)
+    if user_id == low:
+        return Conversation.low_unread_count, Conversation.low_last_read_id
+    return Conversation.high_unread_count, Conversation.high_last_read_id
+
+
+def _pair_filter(user_id, other_id):
+    low, high = conversation_pair(user_id, other_id)
+    return db.and_(Conversation.user_low_id == low, Conversation.user_high_id == high)
+
+
+def record_message(message):
+    """Make a flushed message the last one of its conversation and count it as unread for the recipient.
+
+    Updates the conversation in place, creating it for the pair's first message.
+    """
+    unread, _ = _side_columns(message.recipient_id, message.sender_id)
+    values = {
+        'last_message_id': message.id,
+        'preview': message.content[:PREVIEW_LENGTH],
+        'last_activity': message.timestamp,
+    }
+    updated = db.session.execute(
+        db.update(Conversation)
+        .where(_pair_filter(message.sender_id, message.recipient_id))
+        .values(**values, **{unread.key: unread + 1})
+    ).rowcount
+    if not updated:
+        low, high = conversation_pair(message.sender_id, message.recipient_id)
+        db.session.add(Conversation(user_low_id=low, user_high_id=high, **values, **{unread.key: 1}))
+
+
+def mark_conversation_read(user_id, other_id):
+    """Move ``user_id``'s read watermark up to the conversation's last message and reset their unread count.
+
+    One single-row update, which changes nothing if they had already read
+    everything. Returns whether it did change anything.
+    """
+    unread, last_read = _side_columns(user_id, other_id)
+    return db.session.execute(
+        db.update(Conversation)
+        .where(_pair_filter(user_id, other_id), last_read < Conversation.last_message_id)
+        .values(**{last_read.key: Conversation.last_message_id, unread.key: 0})
+    ).rowcount > 0
+
+
+def read_watermarks(user_id, other_id):
+    """Return the newest message ids read by ``user_id`` and by ``other_id`` in their conversation.
+
+    Messages up to a watermark are read, so comparing a message's id with
+    the recipient's watermark gives its read receipt. Both are 0 before the
+    users' first message.
+    """
+    _, last_read = _side_columns(user_id, other_id)
+    _, other_last_read = _side_columns(other_id, user_id)
+    row = db.session.execute(
+        db.select(last_read, other_last_read).where(_pair_filter(user_id, other_id))
+    ).first()
+    return tuple(row) if row is not None else (0, 0)
+
+
+def inbox_position(user_id, conversation_id):
+    """Return the (last_activity, id) position of one of a user's conversations.
+
+    Raises ``ValueError`` if the conversation is not theirs.
+    """
+    last_activity = db.session.execute(
+        db.select(Conversation.last_activity).where(
+            Conversation.id == conversation_id,
+            db.or_(Conversation.user_low_id == user_id, Conversation.user_high_id == user_id)
+        )
+    ).scalar()
+    if last_activity is None:
+        raise ValueError(f"Conversation {conversation_id} not found")
+    return last_activity, conversation_id
+
+
+def inbox_query(user_id, limit=None, before=None):
+    """Select a user's conversations, most recently active first, before a position.
+
+    Rows hold the conversation's ``id`` and ``last_activity`` first, for the
+    cursor, then the other participant's ``user_id``, ``username``,
+    ``first_name`` and ``last_name``, the ``preview`` and the user's
+    ``unread_count``. The conversations where the user is the low and the
+    high side of the pair are read as separate branches, each a range scan
+    on its (user, last_activity) index, limited before the merge.
+    """
+    branches = []
+    for side, other_side, unread in (
+        (Conversation.user_low_id, Conversation.user_high_id, Conversation.low_unread_count),
+        (Conversation.user_high_id, Conversation.user_low_id, Conversation.high_unread_count)
+    ):
+        branch = db.select(
+            Conversation.id.label('id'),
+            Conversation.last_activity.label('last_activity'),
+            other_side.label('other_id'),
+            Conversation.preview.label('preview'),
+            unread.label('unread_count')
+        ).where(side == user_id)
+        if before is not None:
+            last_activity, conversation_id = before
+            branch = branch.where(db.or_(
+                Conversation.last_activity < last_activity,
+                db.and_(Conversation.last_activity == last_activity, Conversation.id < conversation_id)
+            ))
+        if limit is not None:
+            branch = branch.order_by(Conversation.last_activity.desc(), Conversation.id.desc()).limit(limit)
+        branches.append(db.select(branch.subquery()))
+    combined = db.union_all(*branches).subquery('inbox')
+    query = (
+        db.select(
+            combined.c.id,
+            combined.c.last_activity,
+            User.id.label('user_id'),
+            User.username,
+            User.first_name,
+            User.last_name,
+            combined.c.preview,
+            combined.c.unread_count
+        )
+        .join(User, User.id == combined.c.other_id)
+        .order_by(combined.c.last_activity.desc(), combined.c.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def load_inbox(user_id, limit, before=None):
+    """Load a page of a user's conversations before a conversation id.
+
+    Raises ``ValueError`` if ``before`` is not one of their conversations.
+    """
+    position = inbox_position(user_id, before) if before is not None else None
+    rows = db.session.execute(inbox_query(user_id, limit + 1, position)).all()
+    after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        after = rows[-1].id
+    return InboxPage(rows, after)
+
+
+def backfill_conversations():
+    """Rebuild every conversation from the messages table in one statement.
+
+    Each side's read watermark becomes the newest message to them that is
+    marked read.
+
+    Returns the number of conversations written.
+    """
+    low = db.case((Message.sender_id < Message.recipient_id, Message.sender_id), else_=Message.recipient_id)
+    high = db.case((Message.sender_id < Message.recipient_id, Message.recipient_id), else_=Message.sender_id)
+    pairs = (
+        db.select(
+            low.label('user_low_id'),
+            high.label('user_high_id'),
+            db.func.max(Message.id).label('last_message_id'),
+            db.func.sum(db.case((db.and_(Message.recipient_id == low, Message.is_read == False), 1), else_=0))
+            .label('low_unread_count'),
+            db.func.sum(db.case(
+                (db.and_(Message.recipient_id == high, Message.sender_id != high, Message.is_read == False), 1),
+                else_=0
+            )).label('high_unread_count'),
+            db.func.coalesce(db.func.max(db.case(
+                (db.and_(Message.recipient_id == low, Message.is_read == True), Message.id)
+            )), 0).label('low_last_read_id'),
+            db.func.coalesce(db.func.max(db.case(
+                (db.and_(Message.recipient_id == high, Message.sender_id != high, Message.is_read == True), Message.id)
+            )), 0).label('high_last_read_id')
+        )
+        .group_by(low, high)
+        .subquery('pairs')
+    )
+    db.session.execute(db.delete(Conversation))
+    return db.session.execute(
+        db.insert(Conversation).from_select(
+            ['user_low_id', 'user_high_id', 'last_message_id', 'preview', 'last_activity',
+             'low_unread_count', 'high_unread_count', 'low_last_read_id', 'high_last_read_id'],
+            db.select(
+                pairs.c.user_low_id,
+                pairs.c.user_high_id,
+                pairs.c.last_message_id,
+                db.func.substr(Message.content, 1, PREVIEW_LENGTH),
+                Message.timestamp,
+                pairs.c.low_unread_count,
+                pairs.c.high_unread_count,
+                pairs.c.low_last_read_id,
+                pairs.c.high_last_read_id
+            ).join(Message, Message.id == pairs.c.last_message_id)
+        )
+    ).rowcount
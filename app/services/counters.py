@@ -0,0 +1,69 @@
+from app import db
+from app.models import Post, PostLike, PostShare, Comment
+
+# Counter attributes on Post and the rows they count
+COUNTED = (
+    ('like_counter', PostLike),
+    ('share_counter', PostShare),
+    ('comment_counter', Comment),
+)
+
+
+def adjust_counters(post_id, likes=0, shares=0, comments=0):
+    """Add to a post's engagement counters with a single atomic UPDATE"""
+    values = {}
+    for attribute, delta in (('like_counter', likes), ('share_counter', shares), ('comment_counter', comments)):
+        if delta:
+            column = getattr(Post, attribute)
+            values[column] = column + delta
+    if values:
+        db.session.execute(db.update(Post).where(Post.id == post_id).values(values))
+
+
+def _actual_counts(model, post_ids):
+    """Count rows of ``model`` per post"""
+    return dict(db.session.execute(
+        db.select(model.post_id, db.func.count(model.id))
+        .where(model.post_id.in_(post_ids))
+        .group_by(model.post_id)
+    ).all())
+
+
+def reconcile_counters(chunk_size=500, dry_run=False):
+    """Recompute every post's counters in id-ordered chunks.
+
+    Each chunk is committed on its own so writers are only blocked briefly.
+    Returns the number of posts checked and a list of
+    ``(post_id, attribute, stored, actual)`` drift records.
+    """
+    checked = 0
+    drift = []
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Post.id, Post.like_counter, Post.share_counter, Post.comment_counter)
+            .where(Post.id > last_id)
+            .order_by(Post.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        post_ids = [row.id for row in rows]
+        actual = {attribute: _actual_counts(model, post_ids) for attribute, model in COUNTED}
+        for row in rows:
+            values = {}
+            for attribute, _ in COUNTED:
+                stored = getattr(row, attribute)
+                count = actual[attribute].get(row.id, 0)
+                if stored != count:
+                    drift.append((row.id, attribute, stored, count))
+                    values[getattr(Post, attribute)] = count
+            if values and not dry_run:
+                db.session.execute(db.update(Post).where(Post.id == row.id).values(values))
+
+        if not dry_run:
+            db.session.commit()
+        checked += len(rows)
+        last_id = post_ids[-1]
+    return checked, drift
@@ -0,0 +1,83 @@
+from collections import namedtuple
+from flask import g
+from flask_login import current_user
+from app import db
+from app.models import Post, PostLike, PostShare
+
+# Counts for a post plus whether the viewer has liked or shared it
+PostEngagement = namedtuple('PostEngagement', ['like_count', 'share_count', 'comment_count', 'liked', 'shared'])
+
+
+class EngagementLoader:
+    """Loads engagement for many posts at once and remembers it.
+
+    Each ``load`` costs a fixed number of queries no matter how many posts it
+    covers: counts come from the denormalized counters on Post, and the likes,
+    shares and comments themselves are never loaded.
+    """
+
+    def __init__(self, viewer_id=None):
+        self.viewer_id = viewer_id
+        self._engagement = {}
+
+    def _viewer_post_ids(self, model, post_ids):
+        """Select which of the posts have a ``model`` row by the viewer"""
+        if self.viewer_id is None:
+            return set()
+        return set(db.session.scalars(
+            db.select(model.post_id).where(
+                model.post_id.in_(post_ids),
+                model.user_id == self.viewer_id
+            )
+        ))
+
+    def load(self, post_ids):
+        """Load engagement for every post not loaded yet"""
+        post_ids = {post_id for post_id in post_ids if post_id not in self._engagement}
+        if not post_ids:
+            return
+
+        counts = {
+            row.id: row for row in db.session.execute(
+                db.select(Post.id, Post.like_counter, Post.share_counter, Post.comment_counter)
+                .where(Post.id.in_(post_ids))
+            )
+        }
+        liked = self._viewer_post_ids(PostLike, post_ids)
+        shared = self._viewer_post_ids(PostShare, post_ids)
+
+        for post_id in post_ids:
+            row = counts.get(post_id)
+            self._engagement[post_id] = PostEngagement(
+                row.like_counter if row else 0,
+                row.share_counter if row else 0,
+                row.comment_counter if row else 0,
+                post_id in liked,
+                post_id in shared
+            )
+
+    def get(self, post_id):
+        """Return the engagement of one post, loading it if needed"""
+        if post_id not in self._engagement:
+            self.load([post_id])
+        return self._engagement[post_id]
+
+
+def get_engagement_loader():
+    """Return the engagement loader for the current request and viewer"""
+    if 'engagement_loader' not in g:
+        viewer_id = current_user.id if current_user.is_authenticated else None
+        g.engagement_loader = EngagementLoader(viewer_id)
+    return g.engagement_loader
+
+
+def load_engagement(posts):
+    """Load engagement for a list of posts or feed items in one batch"""
+    loader = get_engagement_loader()
+    loader.load(post.id for post in posts)
+    return loader
+
+
+def post_engagement(post_id):
+    """Return the engagement of one post through the request's loader"""
+    return get_engagement_loader().get(post_id)
@@ -0,0 +1,202 @@
+import json
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import Message, Notification
+from .unread import unread_counts
+
+# Where a client's stream has got to; used as the SSE event id. Notifications are coalesced in
+# place, which moves them to a new timestamp under the same id, so they are followed by
+# (timestamp, id); messages never change and are followed by id alone.
+Watermark = namedtuple('Watermark', ['notification_time', 'notification_id', 'message_id'])
+
+EPOCH = datetime(1970, 1, 1)
+
+# Rows read per query when catching a client up
+REPLAY_BATCH_SIZE = 100
+
+
+class EventBroker:
+    """In-process pub/sub that wakes up the event streams of a user.
+
+    Publishing carries no payload: a woken stream reads whatever is new for
+    its user from the database, after the watermark it has already sent.
+    Missed or duplicate wake-ups therefore never lose or repeat events, and
+    the same read serves reconnects that replay from ``Last-Event-ID``.
+    Only streams held by this process are woken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        """Register a stream for a user and return the event it waits on"""
+        wakeup = threading.Event()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(wakeup)
+        return wakeup
+
+    def unsubscribe(self, user_id, wakeup):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(wakeup)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, *user_ids):
+        """Wake every stream of the given users"""
+        with self._lock:
+            wakeups = [wakeup for user_id in user_ids for wakeup in self._subscribers.get(user_id, ())]
+        for wakeup in wakeups:
+            wakeup.set()
+
+    def stats(self):
+        """Return the number of users and streams connected to this process"""
+        with self._lock:
+            return {
+                'users': len(self._subscribers),
+                'streams': sum(len(subscribers) for subscribers in self._subscribers.values())
+            }
+
+
+def init_event_broker(app):
+    """Create the application's event broker"""
+    app.extensions['event_broker'] = EventBroker()
+
+
+def get_event_broker():
+    """Return the current application's event broker"""
+    return current_app.extensions['event_broker']
+
+
+def publish_events(*user_ids):
+    """Tell the users' open event streams that something new was committed for them"""
+    get_event_broker().publish(*user_ids)
+
+
+def encode_watermark(watermark):
+    micros = (watermark.notification_time - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{watermark.notification_id}:{watermark.message_id}"
+
+
+def decode_watermark(value):
+    """Parse a ``Last-Event-ID``; raises ``ValueError`` if it is not one of ours"""
+    notification, message_id = value.split(':')
+    micros, notification_id = notification.split('-')
+    return Watermark(EPOCH + timedelta(microseconds=int(micros)), int(notification_id), int(message_id))
+
+
+def current_watermark(user_id):
+    """Return the user's newest notification position and message id"""
+    newest = (
+        db.select(Notification.timestamp, Notification.id)
+        .where(Notification.user_id == user_id)
+        .order_by(Notification.timestamp.desc(), Notification.id.desc())
+        .limit(1)
+        .subquery()
+    )
+    row = db.session.execute(db.select(
+        db.select(newest.c.timestamp).scalar_subquery(),
+        db.select(newest.c.id).scalar_subquery(),
+        db.select(db.func.max(Message.id)).where(Message.recipient_id == user_id).scalar_subquery()
+    )).one()
+    return Watermark(row[0] or EPOCH, row[1] or 0, row[2] or 0)
+
+
+def _format_event(event_type, watermark, data):
+    """Format one SSE event"""
+    return f"id: {encode_watermark(watermark)}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def events_after(user_id, watermark):
+    """Read the user's notifications and messages after a watermark.
+
+    Notifications are read in (timestamp, id) order, so one coalesced
+    since the watermark is sent again with its new content and the same id.
+    Returns the formatted events, oldest first within each kind, the new
+    watermark and whether more rows are waiting. Each event's id is the
+    watermark up to and including it, and each carries the user's unread
+    counts for the badges, since an update does not add to them.
+    """
+    events = []
+    notifications = db.session.execute(
+        db.select(Notification.id, Notification.content, Notification.notification_type,
+                  Notification.post_id, Notification.timestamp)
+        .where(
+            Notification.user_id == user_id,
+            db.tuple_(Notification.timestamp, Notification.id)
+            > db.tuple_(watermark.notification_time, watermark.notification_id)
+        )
+        .order_by(Notification.timestamp, Notification.id)
+        .limit(REPLAY_BATCH_SIZE)
+    ).all()
+    unread = unread_counts(user_id)._asdict() if notifications else None
+    for row in notifications:
+        watermark = watermark._replace(notification_time=row.timestamp, notification_id=row.id)
+        events.append(_format_event('notification', watermark, {
+            'id': row.id,
+            'content': row.content,
+            'notification_type': row.notification_type,
+            'post_id': row.post_id,
+            'timestamp': row.timestamp.isoformat(),
+            'unread': unread
+        }))
+
+    messages = db.session.execute(
+        db.select(Message.id, Message.sender_id, Message.content, Message.timestamp)
+        .where(Message.recipient_id == user_id, Message.id > watermark.message_id)
+        .order_by(Message.id)
+        .limit(REPLAY_BATCH_SIZE)
+    ).all()
+    if messages and unread is None:
+        unread = unread_counts(user_id)._asdict()
+    for row in messages:
+        watermark = watermark._replace(message_id=row.id)
+        events.append(_format_event('message', watermark, {
+            'id': row.id,
+            'sender_id': row.sender_id,
+            'content': row.content,
+            'timestamp': row.timestamp.isoformat(),
+            'unread': unread
+        }))
+
+    more = len(notifications) == REPLAY_BATCH_SIZE or len(messages) == REPLAY_BATCH_SIZE
+    return events, watermark, more
+
+
+def event_stream(app, user_id, watermark):
+    """Yield SSE events for a user until the client disconnects.
+
+    Holds no database connection or request context while idle: each read
+    runs in its own app context and releases its session. A comment line is
+    sent every ``SSE_HEARTBEAT`` seconds so proxies keep the connection open,
+    and when notifications are dispatched by a separate worker the stream
+    also reads from the database then.
+    """
+    broker = app.extensions['event_broker']
+    heartbeat = app.config['SSE_HEARTBEAT']
+    # A separate dispatcher process cannot wake this one's streams, so they look for news at each heartbeat
+    poll = app.config['OUTBOX_DISPATCHER'] != 'thread'
+    wakeup = broker.subscribe(user_id)
+    try:
+        yield f"retry: {app.config['SSE_RETRY_MS']}\n\n"
+        # Catch up on anything after the client's last event (or since connecting)
+        wakeup.set()
+        while True:
+            if not wakeup.wait(heartbeat):
+                yield ": heartbeat\n\n"
+                if not poll:
+                    continue
+            wakeup.clear()
+            more = True
+            while more:
+                with app.app_context():
+                    events, watermark, more = events_after(user_id, watermark)
+                if events:
+                    yield ''.join(events)
+    finally:
+        broker.unsubscribe(user_id, wakeup)
@@ -0,0 +1,211 @@
+from flask import current_app
+from app import db
+from app.models import Friendship, FeedEntry
+from .timeline import (POST_ITEM, SHARE_ITEM, friend_ids_query, feed_author_ids, timeline_branches,
+                       merge_branches, load_page)
+
+
+def friend_count_query(user_id):
+    """Count the accepted friendships of a user (a column or an id)"""
+    return db.select(db.func.count(Friendship.id)).where(
+        Friendship.status == 'accepted',
+        db.or_(Friendship.user_id == user_id, Friendship.friend_id == user_id)
+    ).scalar_subquery()
+
+
+def fans_out_on_write(user_id):
+    """Check whether a user's posts are copied into their friends' feeds on write"""
+    threshold = current_app.config['FEED_FANOUT_MAX_FRIENDS']
+    return db.session.scalar(db.select(friend_count_query(user_id))) <= threshold
+
+
+def high_fanout_friend_ids(user_id):
+    """Select the friends of a user whose posts are read at request time"""
+    friends = friend_ids_query(user_id).subquery()
+    friend_id = friends.c[0]
+    return db.select(friend_id).where(
+        friend_count_query(friend_id) > current_app.config['FEED_FANOUT_MAX_FRIENDS']
+    )
+
+
+def _recipients(user_id):
+    """Select the viewers an item by this user is written to"""
+    if fans_out_on_write(user_id):
+        return feed_author_ids(user_id).subquery()
+    # Popular users only write to their own feed
+    return db.select(db.literal(user_id).label('viewer_id')).subquery()
+
+
+def _insert_entries(select):
+    """Insert feed entries from a select of their column values"""
+    db.session.execute(
+        db.insert(FeedEntry).from_select(
+            ['viewer_id', 'kind', 'item_id', 'post_id', 'actor_id', 'created_at'],
+            select
+        )
+    )
+
+
+def fan_out_post(post):
+    """Write a new post into its author's and friends' feeds"""
+    recipients = _recipients(post.user_id)
+    _insert_entries(db.select(
+        recipients.c[0],
+        db.literal(POST_ITEM),
+        db.literal(post.id),
+        db.literal(post.id),
+        db.literal(post.user_id),
+        db.literal(post.date_posted, db.DateTime)
+    ))
+
+
+def fan_out_share(share):
+    """Write a new share into its sharer's and friends' feeds"""
+    recipients = _recipients(share.user_id)
+    _insert_entries(db.select(
+        recipients.c[0],
+        db.literal(SHARE_ITEM),
+        db.literal(share.id),
+        db.literal(share.post_id),
+        db.literal(share.user_id),
+        db.literal(share.shared_at, db.DateTime)
+    ))
+
+
+def retract_share(share):
+    """Remove a share from every feed it was written to"""
+    db.session.execute(
+        db.delete(FeedEntry).where(
+            FeedEntry.kind == SHARE_ITEM,
+            FeedEntry.item_id == share.id
+        )
+    )
+
+
+def _copy_history(viewer_id, actor_id, skip_existing=False):
+    """Write every post and share by ``actor_id`` into one viewer's feed.
+
+    A user's own history is always copied, like ``fan_out_post`` always
+    writes to the author's feed; other actors' only if they fan out on
+    write. With ``skip_existing``, items already in the feed are left out.
+    """
+    if viewer_id != actor_id and not fans_out_on_write(actor_id):
+        return
+    for branch in timeline_branches([actor_id]):
+        items = branch.subquery()
+        select = db.select(
+            db.literal(viewer_id),
+            items.c.kind,
+            items.c.item_id,
+            items.c.post_id,
+            items.c.user_id,
+            items.c.sort_date
+        )
+        if skip_existing:
+            select = select.where(~db.select(FeedEntry.id).where(
+                FeedEntry.viewer_id == viewer_id,
+                FeedEntry.kind == items.c.kind,
+                FeedEntry.item_id == items.c.item_id
+            ).exists())
+        _insert_entries(select)
+
+
+def _refill_friend_feeds(user_id):
+    """Copy a user's history into their friends' feeds once they fan out on write again.
+
+    Posts and shares written while the user was above the fan-out threshold
+    only reached their own feed, and friends' feeds stop merging them in on
+    read as soon as the user is back under it.
+    """
+    for friend_id in db.session.scalars(friend_ids_query(user_id)).all():
+        _copy_history(friend_id, user_id, skip_existing=True)
+
+
+def connect_feeds(user_id, friend_id):
+    """Write two new friends' existing posts and shares into each other's feeds"""
+    _copy_history(user_id, friend_id)
+    _copy_history(friend_id, user_id)
+
+
+def disconnect_feeds(user_id, friend_id):
+    """Remove two former friends' posts and shares from each other's feeds.
+
+    Call once the friendship is gone. Either user who drops back to the
+    fan-out threshold has their history copied into their remaining
+    friends' feeds.
+    """
+    db.session.execute(
+        db.delete(FeedEntry).where(
+            db.or_(
+                db.and_(FeedEntry.viewer_id == user_id, FeedEntry.actor_id == friend_id),
+                db.and_(FeedEntry.viewer_id == friend_id, FeedEntry.actor_id == user_id)
+            )
+        )
+    )
+    threshold = current_app.config['FEED_FANOUT_MAX_FRIENDS']
+    for current_id in (user_id, friend_id):
+        if db.session.scalar(db.select(friend_count_query(current_id))) == threshold:
+            _refill_friend_feeds(current_id)
+
+
+def backfill_feed(user_id):
+    """Rebuild one user's materialized feed from posts, shares and friendships"""
+    db.session.execute(db.delete(FeedEntry).where(FeedEntry.viewer_id == user_id))
+    _copy_history(user_id, user_id)
+    friend_ids = db.session.scalars(friend_ids_query(user_id)).all()
+    for friend_id in friend_ids:
+        _copy_history(user_id, friend_id)
+
+
+def _feed_entry_branch(viewer_id, limit, before, excluded_actor_ids):
+    """Build the materialized part of a home feed as a timeline branch"""
+    branch = db.select(
+        FeedEntry.kind.label('kind'),
+        FeedEntry.item_id.label('item_id'),
+        FeedEntry.post_id.label('post_id'),
+        FeedEntry.actor_id.label('user_id'),
+        FeedEntry.created_at.label('sort_date')
+    ).where(
+        FeedEntry.viewer_id == viewer_id,
+        FeedEntry.actor_id.notin_(excluded_actor_ids)
+    )
+    if before is not None:
+        sort_date, kind, item_id = before
+        branch = branch.where(db.or_(
+            FeedEntry.created_at < sort_date,
+            db.and_(
+                FeedEntry.created_at == sort_date,
+                db.or_(
+                    FeedEntry.kind < kind,
+                    db.and_(FeedEntry.kind == kind, FeedEntry.item_id < item_id)
+                )
+            )
+        ))
+    if limit is not None:
+        branch = branch.order_by(
+            FeedEntry.created_at.desc(),
+            FeedEntry.kind.desc(),
+            FeedEntry.item_id.desc()
+        ).limit(limit)
+    return branch
+
+
+def home_feed_query(viewer_id, limit=None, before=None):
+    """Build the query for a user's home feed.
+
+    Entries fanned out on write are read with a range scan of the viewer's
+    feed; friends above the fan-out threshold are merged in on read.
+    """
+    high_fanout_ids = high_fanout_friend_ids(viewer_id)
+    branches = [_feed_entry_branch(viewer_id, limit, before, high_fanout_ids)]
+    branches += timeline_branches(high_fanout_ids, True, limit, before)
+    return merge_branches(branches, limit)
+
+
+def load_home_feed(viewer_id, limit=None, cursor=None):
+    """Load one page of a user's home feed"""
+    return load_page(
+        lambda page_limit, before: home_feed_query(viewer_id, page_limit, before),
+        limit,
+        cursor
+    )
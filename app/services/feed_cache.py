@@ -0,0 +1,66 @@
+from collections import namedtuple
+from flask import current_app
+from app import db
+from .cache import LRUCache
+from .fanout import home_feed_query, load_home_feed
+from .timeline import feed_author_ids, decode_cursor, page_from_rows
+
+# A cached home feed keeps only item positions, never loaded objects
+FeedPosition = namedtuple('FeedPosition', ['sort_date', 'kind', 'item_id'])
+
+
+def init_feed_cache(app):
+    """Create the application's per-user feed cache from its config"""
+    app.extensions['feed_cache'] = LRUCache(app.config['FEED_CACHE_SIZE'], app.config['FEED_CACHE_TTL'])
+
+
+def get_feed_cache():
+    """Return the current application's feed cache"""
+    return current_app.extensions['feed_cache']
+
+
+def _cached_positions(viewer_id):
+    """Get the head of a user's home feed, reading it into the cache on a miss.
+
+    Returns the positions of the first ``FEED_CACHE_DEPTH`` items and whether
+    that is the whole feed.
+    """
+    cache = get_feed_cache()
+    cached = cache.get(viewer_id)
+    if cached is None:
+        depth = current_app.config['FEED_CACHE_DEPTH']
+        rows = db.session.execute(home_feed_query(viewer_id, depth + 1)).all()
+        positions = tuple(FeedPosition(row.sort_date, row.kind, row.item_id) for row in rows[:depth])
+        cached = (positions, len(rows) <= depth)
+        cache.set(viewer_id, cached)
+    return cached
+
+
+def cached_home_feed(viewer_id, limit, cursor=None):
+    """Load one page of a user's home feed through the feed cache.
+
+    Pages inside the cached head are served from it; deeper pages fall back
+    to the database. Raises ``ValueError`` for an invalid cursor.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    positions, complete = _cached_positions(viewer_id)
+
+    start = 0
+    if before is not None:
+        start = positions.index(before) + 1 if before in positions else None
+    if start is not None:
+        window = positions[start:start + limit + 1]
+        if len(window) > limit or complete:
+            return page_from_rows(window, limit)
+
+    return load_home_feed(viewer_id, limit, cursor)
+
+
+def invalidate_feeds(*user_ids):
+    """Drop the cached home feeds of the given users"""
+    get_feed_cache().delete(*user_ids)
+
+
+def invalidate_friend_feeds(user_id):
+    """Drop the cached home feeds of a user and all of their friends"""
+    invalidate_feeds(*db.session.scalars(feed_author_ids(user_id)).all())
@@ -0,0 +1,56 @@
+from collections import defaultdict
+from app.models import User, Media
+
+# Item kinds in the combined timeline; shares sort before posts on equal timestamps
+POST_ITEM = 0
+SHARE_ITEM = 1
+
+
+class FeedItem:
+    """A post or share as rendered in a feed.
+
+    Holds ids and scalar columns only. ``author``, ``original_author`` and
+    ``media_files`` are filled for a whole page at once by ``resolve_feed_items``.
+    """
+    __slots__ = ('kind', 'id', 'share_id', 'user_id', 'original_author_id', 'title', 'content',
+                 'date_posted', 'author', 'original_author', 'media_files')
+
+    def __init__(self, kind, post_id, share_id, user_id, original_author_id, title, content, date_posted):
+        self.kind = kind
+        self.id = post_id  # Always the original post, so links and buttons act on it
+        self.share_id = share_id
+        self.user_id = user_id  # The author, or the user who shared it
+        self.original_author_id = original_author_id
+        self.title = title
+        self.content = content
+        self.date_posted = date_posted  # Date posted, or date shared
+        self.author = None
+        self.original_author = None
+        self.media_files = ()
+
+    def __repr__(self):
+        return f"FeedItem('{self.kind}', '{self.id}', '{self.date_posted}')"
+
+    @property
+    def is_shared(self):
+        return self.kind == SHARE_ITEM
+
+
+def resolve_feed_items(items):
+    """Load the authors and media of a page of feed items in one query each"""
+    if not items:
+        return items
+
+    user_ids = {item.user_id for item in items} | {item.original_author_id for item in items}
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+
+    media_files = defaultdict(list)
+    post_ids = {item.id for item in items}
+    for media in Media.query.filter(Media.post_id.in_(post_ids)).order_by(Media.id):
+        media_files[media.post_id].append(media)
+
+    for item in items:
+        item.author = users.get(item.user_id)
+        item.original_author = users.get(item.original_author_id)
+        item.media_files = media_files.get(item.id, ())
+    return items
@@ -0,0 +1,47 @@
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from app.models import Post, Comment
+
+
+def _post_summary():
+    """Limit a post to the columns of a summary card; counts come from the counters"""
+    return load_only(
+        Post.id, Post.title, Post.content, Post.date_posted, Post.user_id,
+        Post.like_counter, Post.share_counter, Post.comment_counter
+    )
+
+
+# Loader options for each way a page or endpoint walks posts and comments.
+# Built on use because backrefs such as Post.author only exist once the
+# mappers are configured.
+LOADING_PROFILES = {
+    # Search results: author names and post text, no media
+    'post_summary': lambda: (
+        _post_summary(),
+        joinedload(Post.author)
+    ),
+    # The post page; its comments are loaded with 'comment_thread'
+    'post_detail': lambda: (
+        joinedload(Post.author),
+        selectinload(Post.media_files)
+    ),
+    # Top-level comments with their media, reactions and replies
+    'comment_thread': lambda: (
+        joinedload(Comment.author),
+        selectinload(Comment.media_files),
+        selectinload(Comment.reactions),
+        selectinload(Comment.replies).joinedload(Comment.author)
+    ),
+}
+
+
+def loading_options(name):
+    """Return the loader options of a named loading profile"""
+    build = LOADING_PROFILES.get(name)
+    if build is None:
+        raise ValueError(f"Unknown loading profile: {name!r}")
+    return build()
+
+
+def with_profile(query, name):
+    """Apply a named loading profile to a query or select"""
+    return query.options(*loading_options(name))
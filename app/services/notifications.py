@@ -0,0 +1,204 @@
+from collections import namedtuple
+from datetime import datetime
+from app import db
+from app.models import Notification, NotificationActor
+
+# One page of a user's notifications, newest first, and the ``before`` id of the page after it
+NotificationPage = namedtuple('NotificationPage', ['notifications', 'before'])
+
+
+def notification_position(user_id, notification_id):
+    """Return the (timestamp, id) position of one of a user's notifications.
+
+    Raises ``ValueError`` if the notification is not theirs.
+    """
+    timestamp = db.session.execute(
+        db.select(Notification.timestamp)
+        .where(Notification.id == notification_id, Notification.user_id == user_id)
+    ).scalar()
+    if timestamp is None:
+        raise ValueError(f"Notification {notification_id} not found")
+    return timestamp, notification_id
+
+
+def notifications_query(columns, user_id, limit=None, before=None, actor_id=None, target=None):
+    """Select ``columns`` of a user's notifications, newest first, before a position.
+
+    ``id`` and ``timestamp`` are always selected first, for the cursor, and
+    the query is a range scan on the (user_id, timestamp, id) index.
+    ``actor_id`` and ``target``, a (target_type, target_id) pair, narrow it
+    to one actor's notifications or one post's, comment's or message's.
+    """
+    query = db.select(Notification.id, Notification.timestamp, *columns).where(Notification.user_id == user_id)
+    if actor_id is not None:
+        query = query.where(Notification.actor_id == actor_id)
+    if target is not None:
+        target_type, target_id = target
+        query = query.where(Notification.target_type == target_type, Notification.target_id == target_id)
+    if before is not None:
+        timestamp, notification_id = before
+        query = query.where(db.or_(
+            Notification.timestamp < timestamp,
+            db.and_(Notification.timestamp == timestamp, Notification.id < notification_id)
+        ))
+    query = query.order_by(Notification.timestamp.desc(), Notification.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def load_notifications(columns, user_id, limit, before=None, actor_id=None, target=None):
+    """Load a page of a user's notifications before a notification id.
+
+    Raises ``ValueError`` if ``before`` is not one of their notifications.
+    """
+    position = notification_position(user_id, before) if before is not None else None
+    rows = db.session.execute(notifications_query(columns, user_id, limit + 1, position, actor_id, target)).all()
+    after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        after = rows[-1][0]
+    return NotificationPage(rows, after)
+
+
+def mark_notifications_read(user_id, up_to=None):
+    """Mark a user's unread notifications as read in one statement.
+
+    With ``up_to``, a timestamp, only notifications up to that time are
+    marked, so ones that arrived or were coalesced into after a page was
+    read stay unread. Timestamps rather than ids are compared because
+    coalescing moves an existing row's timestamp forward.
+    """
+    query = db.update(Notification).where(Notification.user_id == user_id, Notification.is_read == False)
+    if up_to is not None:
+        query = query.where(Notification.timestamp <= up_to)
+    db.session.execute(query.values(is_read=True))
+
+
+# Notification types that are coalesced per target, and what their actors did
+COALESCED_ACTIONS = {
+    'like': 'liked your post',
+    'share': 'shared your post',
+    'comment': 'commented on your post',
+    'comment_reaction': 'reacted to your comment',
+}
+
+# Actors named on a coalesced notification
+RECENT_ACTORS = 3
+
+
+def coalesced_content(notification_type, actors, actor_count):
+    """Render e.g. "Ana Smith and 23 others liked your post" """
+    names = [actor['name'] for actor in actors]
+    others = actor_count - 1
+    if not names:
+        # Every named actor has retracted; the remaining ones are only counted
+        subject = f"{actor_count} people"
+    elif others == 0:
+        subject = names[0]
+    elif others == 1 and len(names) > 1:
+        subject = f"{names[0]} and {names[1]}"
+    else:
+        subject = f"{names[0]} and {others} {'other' if others == 1 else 'others'}"
+    return f"{subject} {COALESCED_ACTIONS[notification_type]}"
+
+
+def _group(user_id, notification_type, target_type, target_id, unread_only=False):
+    """Find a user's newest notification of one type for one target, through the target index"""
+    query = Notification.query.filter_by(
+        user_id=user_id,
+        notification_type=notification_type,
+        target_type=target_type,
+        target_id=target_id
+    )
+    if unread_only:
+        query = query.filter(Notification.is_read == False)
+    return query.order_by(Notification.id.desc()).first()
+
+
+def coalesce_notification(user_id, actor, notification_type, target_type, target_id, post_id=None):
+    """Add an actor to the recipient's unread notification for a target, or start a new one.
+
+    Unread notifications are updated in place: the actor moves to the
+    front of the recent actors, the count goes up if they are not already
+    counted on it (checked against notification_actor, since only the most
+    recent actors are named), and the notification moves to the top. Once
+    read, the next action starts a new notification. Returns whether a
+    notification was created.
+    """
+    entry = {'id': actor.id, 'name': f"{actor.first_name} {actor.last_name}"}
+    notification = _group(user_id, notification_type, target_type, target_id, unread_only=True)
+    if notification is None:
+        db.session.add(Notification(
+            user_id=user_id,
+            post_id=post_id,
+            notification_type=notification_type,
+            actor_id=actor.id,
+            target_type=target_type,
+            target_id=target_id,
+            actor_count=1,
+            actors=[entry],
+            content=coalesced_content(notification_type, [entry], 1),
+            counted_actors=[NotificationActor(actor_id=actor.id)]
+        ))
+        return True
+
+    counted = db.session.scalar(
+        db.select(NotificationActor.actor_id)
+        .where(NotificationActor.notification_id == notification.id, NotificationActor.actor_id == actor.id)
+    )
+    if counted is None:
+        notification.actor_count += 1
+        db.session.add(NotificationActor(notification_id=notification.id, actor_id=actor.id))
+    actors = [other for other in notification.actors or [] if other['id'] != actor.id]
+    # Reassigned rather than mutated so the JSON column is written
+    notification.actors = [entry] + actors[:RECENT_ACTORS - 1]
+    notification.actor_id = actor.id
+    notification.content = coalesced_content(notification_type, notification.actors, notification.actor_count)
+    notification.timestamp = datetime.utcnow()
+    return False
+
+
+def retract_notification(user_id, actor, notification_type, target_type, target_id):
+    """Take an actor back out of the notification for a target they are counted on, after an unlike or unshare.
+
+    The newest of the recipient's notifications for the target that counts
+    the actor is found in one query, through the target index and
+    notification_actor; if none does, nothing changes. The notification is
+    deleted when no actors are left. Returns whether one was changed.
+    """
+    # Nobody is notified of their own actions
+    if user_id == actor.id:
+        return False
+    notification = (
+        Notification.query
+        .join(NotificationActor, db.and_(
+            NotificationActor.notification_id == Notification.id,
+            NotificationActor.actor_id == actor.id
+        ))
+        .filter(
+            Notification.user_id == user_id,
+            Notification.notification_type == notification_type,
+            Notification.target_type == target_type,
+            Notification.target_id == target_id
+        )
+        .order_by(Notification.id.desc())
+        .first()
+    )
+    if notification is None:
+        return False
+    if notification.actor_count <= 1:
+        db.session.delete(notification)
+        return True
+
+    db.session.execute(
+        db.delete(NotificationActor)
+        .where(NotificationActor.notification_id == notification.id, NotificationActor.actor_id == actor.id)
+    )
+    actors = [other for other in notification.actors or [] if other['id'] != actor.id]
+    notification.actor_count -= 1
+    notification.actors = actors
+    # With nobody named, no actor is known to be on it any more
+    notification.actor_id = actors[0]['id'] if actors else None
+    notification.content = coalesced_content(notification_type, actors, notification.actor_count)
+    return True
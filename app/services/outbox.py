@@ -0,0 +1,245 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import User, Notification, NotificationOutbox
+from .notifications import COALESCED_ACTIONS, coalesce_notification, retract_notification
+from .unread import invalidate_unread
+from .events import publish_events
+
+# Seconds the dispatcher waits before retrying after the database was busy
+RETRY_DELAY = 0.5
+
+
+def queue_notification(user_id, actor, notification_type, content=None, target_type=None, target_id=None,
+                       post_id=None):
+    """Queue a notification in the current transaction, to be written by the dispatcher.
+
+    Coalesced types (see ``COALESCED_ACTIONS``) need a target and render
+    their own content; other types are stored with ``content`` as given.
+    Nobody is notified of their own actions.
+    """
+    if user_id == actor.id:
+        return
+    db.session.add(NotificationOutbox(
+        action='notify',
+        user_id=user_id,
+        actor_id=actor.id,
+        notification_type=notification_type,
+        content=content,
+        target_type=target_type,
+        target_id=target_id,
+        post_id=post_id
+    ))
+
+
+def queue_retraction(user_id, actor, notification_type, target_type, target_id):
+    """Queue taking an actor back out of a coalesced notification, after an unlike or unshare"""
+    if user_id == actor.id:
+        return
+    db.session.add(NotificationOutbox(
+        action='retract',
+        user_id=user_id,
+        actor_id=actor.id,
+        notification_type=notification_type,
+        target_type=target_type,
+        target_id=target_id
+    ))
+
+
+def _apply_entry(entry, actor):
+    """Write, coalesce or retract the notification an outbox entry asks for"""
+    if entry.action == 'retract':
+        retract_notification(entry.user_id, actor, entry.notification_type, entry.target_type, entry.target_id)
+    elif entry.notification_type in COALESCED_ACTIONS:
+        coalesce_notification(entry.user_id, actor, entry.notification_type, entry.target_type,
+                              entry.target_id, post_id=entry.post_id)
+    else:
+        db.session.add(Notification(
+            user_id=entry.user_id,
+            post_id=entry.post_id,
+            notification_type=entry.notification_type,
+            actor_id=entry.actor_id,
+            target_type=entry.target_type,
+            target_id=entry.target_id,
+            content=entry.content
+        ))
+
+
+def _claim(*conditions, limit=None):
+    """Delete outbox entries and return them, oldest first.
+
+    Deleting is the transaction's first statement, so it takes the write
+    lock straight away instead of upgrading a read, and an entry claimed by
+    another dispatcher is simply not returned.
+    """
+    ids = db.select(NotificationOutbox.id).where(*conditions).order_by(NotificationOutbox.id)
+    if limit is not None:
+        ids = ids.limit(limit)
+    entries = db.session.execute(
+        db.delete(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids))
+        .returning(*NotificationOutbox.__table__.c)
+    ).all()
+    return sorted(entries, key=lambda entry: entry.id)
+
+
+def _apply_entries(entries):
+    """Apply claimed entries whose actors still exist"""
+    actors = {
+        user.id: user
+        for user in User.query.filter(User.id.in_({entry.actor_id for entry in entries}))
+    }
+    for entry in entries:
+        actor = actors.get(entry.actor_id)
+        # If the actor's account is gone, there is nothing to say on their behalf
+        if actor is not None:
+            _apply_entry(entry, actor)
+
+
+def _dispatch_one(entry_id):
+    """Claim and apply one entry in its own transaction, dropping it if it cannot be applied"""
+    entries = _claim(NotificationOutbox.id == entry_id)
+    if not entries:
+        return None
+    try:
+        _apply_entries(entries)
+        db.session.commit()
+    except OperationalError:
+        db.session.rollback()
+        raise
+    except Exception:
+        db.session.rollback()
+        entry = entries[0]
+        current_app.logger.exception(
+            'Dropping notification outbox entry %s (%s %s for user %s)',
+            entry.id, entry.action, entry.notification_type, entry.user_id
+        )
+        _claim(NotificationOutbox.id == entry_id)
+        db.session.commit()
+    return entries[0]
+
+
+def dispatch_outbox(batch_size):
+    """Apply the oldest queued notifications in one transaction.
+
+    The batch is claimed by deleting it as the transaction's first
+    statement and applied in the same transaction. If one entry fails, the
+    whole transaction is rolled back and the batch is retried one entry per
+    transaction, so a bad entry is logged and dropped without holding up
+    the others. Database errors such as lock timeouts are raised with
+    everything rolled back, leaving the batch queued for the next attempt.
+    Recipients' unread counters and event streams are updated after the
+    commit. Returns the number of entries dispatched, failed ones included.
+    """
+    entries = _claim(limit=batch_size)
+    if not entries:
+        db.session.rollback()
+        return 0
+    try:
+        _apply_entries(entries)
+        db.session.commit()
+        failed = False
+    except OperationalError:
+        db.session.rollback()
+        raise
+    except Exception:
+        db.session.rollback()
+        failed = True
+    if failed:
+        entries = [entry for entry in map(_dispatch_one, [entry.id for entry in entries]) if entry is not None]
+
+    recipients = {entry.user_id for entry in entries}
+    invalidate_unread(*recipients)
+    publish_events(*recipients)
+    return len(entries)
+
+
+def drain_outbox(batch_size):
+    """Dispatch batches until the outbox is empty; returns the number of entries dispatched"""
+    total = 0
+    while True:
+        count = dispatch_outbox(batch_size)
+        total += count
+        if count < batch_size:
+            return total
+
+
+class OutboxDispatcher:
+    """Background thread that drains the notification outbox.
+
+    Requests wake it after committing; it also polls every
+    ``OUTBOX_POLL_INTERVAL`` seconds so entries left over from a restart
+    or a failed batch are retried. Servers start it when they start (see
+    ``run.py`` and ``gunicorn.conf.py``), and a wake-up starts it if that
+    has not happened; CLI commands and migrations never run it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.batch_size = app.config['OUTBOX_BATCH_SIZE']
+        self.poll_interval = app.config['OUTBOX_POLL_INTERVAL']
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dispatched = 0
+        self.failures = 0
+
+    def start(self):
+        """Start the thread, which drains whatever is already queued straight away"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+                self._wakeup.set()
+
+    def wake(self):
+        """Start the thread if needed and have it drain the outbox now"""
+        self.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    self.dispatched += drain_outbox(self.batch_size)
+                except OperationalError as e:
+                    # Usually a write lock held by a request; the batch is still queued, so try again shortly
+                    db.session.rollback()
+                    self.app.logger.info('Notification outbox busy, retrying: %s', e.orig)
+                    time.sleep(RETRY_DELAY)
+                    self._wakeup.set()
+                except Exception:
+                    db.session.rollback()
+                    self.failures += 1
+                    self.app.logger.exception('Dispatching the notification outbox failed')
+
+    def stats(self):
+        return {
+            'running': self._thread is not None,
+            'dispatched': self.dispatched,
+            'failures': self.failures
+        }
+
+
+def init_outbox_dispatcher(app):
+    """Create the application's outbox dispatcher, unless a separate worker drains the outbox"""
+    if app.config['OUTBOX_DISPATCHER'] == 'thread':
+        app.extensions['outbox_dispatcher'] = OutboxDispatcher(app)
+
+
+def start_outbox_dispatcher(app):
+    """Start the application's in-process dispatcher, if it has one; called when a server starts"""
+    dispatcher = app.extensions.get('outbox_dispatcher')
+    if dispatcher is not None:
+        dispatcher.start()
+
+
+def wake_dispatcher():
+    """Tell the in-process dispatcher that notifications were queued and committed"""
+    dispatcher = current_app.extensions.get('outbox_dispatcher')
+    if dispatcher is not None:
+        dispatcher.wake()
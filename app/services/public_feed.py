@@ -0,0 +1,141 @@
+import threading
+import time
+from flask import current_app, render_template
+from markupsafe import Markup
+from app import db
+from .engagement import EngagementLoader
+from .feed_cache import FeedPosition
+from .feed_item import POST_ITEM
+from .timeline import timeline_query, load_items, decode_cursor, encode_cursor
+
+
+class PublicFeed:
+    """The first pages of the logged-out home feed, precomputed and shared.
+
+    Keeps each post's rendered card next to its feed position, so a hit is
+    served by slicing and joining strings without touching the database.
+    New posts are rendered once and prepended; the whole feed is rebuilt
+    when it is older than ``ttl`` seconds, which also refreshes counts.
+    """
+
+    def __init__(self, pages, per_page, ttl):
+        self.capacity = pages * per_page
+        self.per_page = per_page
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cards = None  # [(FeedPosition, Markup)], newest first
+        self._complete = False  # Whether the cards hold every public post
+        self._built_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _render_cards(self, positions):
+        """Render the cards for feed positions as a logged-out visitor sees them"""
+        items = load_items(positions)
+        engagement = EngagementLoader()
+        engagement.load(item.id for item in items)
+        return [
+            (FeedPosition(item.date_posted, POST_ITEM, item.id),
+             Markup(render_template('post_card.html', post=item, engagement=engagement.get)))
+            for item in items
+        ]
+
+    def rebuild(self):
+        """Read and render the head of the public feed from the database"""
+        rows = db.session.execute(timeline_query(include_shares=False, limit=self.capacity + 1)).all()
+        positions = [FeedPosition(row.sort_date, row.kind, row.item_id) for row in rows[:self.capacity]]
+        cards = self._render_cards(positions)
+        with self._lock:
+            self._cards = cards
+            self._complete = len(rows) <= self.capacity
+            self._built_at = time.monotonic()
+
+    def clear(self):
+        """Drop the rendered feed so the next request rebuilds it"""
+        with self._lock:
+            self._cards = None
+
+    def _fresh(self):
+        return self._cards is not None and time.monotonic() - self._built_at < self.ttl
+
+    def add_post(self, post):
+        """Render a new post's card and put it at the head of the feed"""
+        with self._lock:
+            if not self._fresh():
+                return
+        card = self._render_cards([FeedPosition(post.date_posted, POST_ITEM, post.id)])
+        with self._lock:
+            if not self._fresh():
+                return
+            cards = sorted(self._cards + card, key=lambda entry: entry[0], reverse=True)
+            if len(cards) > self.capacity:
+                cards = cards[:self.capacity]
+                self._complete = False
+            self._cards = cards
+
+    def page(self, cursor=None):
+        """Return the rendered page after ``cursor`` and the next cursor.
+
+        Returns ``None`` when the page is not covered by the precomputed
+        head. Raises ``ValueError`` for an invalid cursor.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            cards, complete = (self._cards, self._complete) if self._fresh() else (None, False)
+        if cards is None:
+            self.misses += 1
+            return None
+
+        positions = [position for position, _ in cards]
+        start = 0
+        if before is not None:
+            if before not in positions:
+                self.misses += 1
+                return None
+            start = positions.index(before) + 1
+
+        end = start + self.per_page
+        if end < len(cards):
+            last = cards[end - 1][0]
+            next_cursor = encode_cursor(last.sort_date, last.kind, last.item_id)
+        elif complete:
+            next_cursor = None
+        else:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return Markup('\n').join(html for _, html in cards[start:end]), next_cursor
+
+    def stats(self):
+        """Return the feed's size and counters"""
+        with self._lock:
+            size = len(self._cards) if self._cards is not None else 0
+        return {'size': size, 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses}
+
+
+def init_public_feed(app):
+    """Create the application's shared logged-out feed from its config"""
+    app.extensions['public_feed'] = PublicFeed(
+        app.config['PUBLIC_FEED_PAGES'],
+        app.config['FEED_PAGE_SIZE'],
+        app.config['PUBLIC_FEED_TTL']
+    )
+
+
+def get_public_feed():
+    """Return the current application's shared logged-out feed"""
+    return current_app.extensions['public_feed']
+
+
+def public_feed_page(cursor=None):
+    """Serve a page of the logged-out feed, rebuilding the shared copy if stale.
+
+    Returns ``None`` for pages deeper than the precomputed head.
+    """
+    feed = get_public_feed()
+    page = feed.page(cursor)
+    if page is None and not cursor:
+        feed.rebuild()
+        page = feed.page(cursor)
+    return page
@@ -0,0 +1,168 @@
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from app import db
+from app.models import Notification, NotificationActor, NotificationArchive
+from .notifications import COALESCED_ACTIONS, RECENT_ACTORS, coalesced_content
+
+# What a prune run did; ``bytes`` approximates the row data removed from the notification table
+PruneReport = namedtuple('PruneReport', ['compacted', 'archived', 'deleted', 'bytes'])
+
+# Columns copied into notification_archive, which has the same names
+ARCHIVED_COLUMNS = ('id', 'content', 'timestamp', 'user_id', 'post_id', 'is_read', 'notification_type',
+                    'actor_id', 'target_type', 'target_id', 'actor_count', 'actors')
+
+# Rough size of a row's fixed-width columns and record overhead
+FIXED_ROW_BYTES = 48
+
+
+def _stored_bytes(notification_ids):
+    """Approximate the stored size of some notifications from their variable-length columns"""
+    size = (
+        db.func.length(Notification.content)
+        + db.func.length(Notification.notification_type)
+        + db.func.coalesce(db.func.length(Notification.target_type), 0)
+        + db.func.coalesce(db.func.length(db.cast(Notification.actors, db.Text)), 0)
+        + FIXED_ROW_BYTES
+    )
+    return db.session.scalar(
+        db.select(db.func.coalesce(db.func.sum(size), 0)).where(Notification.id.in_(notification_ids))
+    )
+
+
+def _compactable_groups(limit, after=None):
+    """Find (user, type, target) groups with more than one read coalescible notification"""
+    key = (Notification.user_id, Notification.notification_type, Notification.target_type, Notification.target_id)
+    query = (
+        db.select(*key, db.func.count().label('count'))
+        .where(
+            Notification.is_read == True,
+            Notification.target_id.isnot(None),
+            Notification.notification_type.in_(COALESCED_ACTIONS)
+        )
+        .group_by(*key)
+        .having(db.func.count() > 1)
+        .order_by(*key)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(db.tuple_(*key) > db.tuple_(*after))
+    return db.session.execute(query).all()
+
+
+def compact_notifications(chunk_size=500, dry_run=False):
+    """Merge each group of read coalescible notifications into its newest one.
+
+    The newest notification keeps the number of distinct actors and the
+    most recent of them; the rest are deleted. Unread notifications are
+    left alone, since the dispatcher still coalesces into them. Each chunk of
+    groups is its own transaction. Returns the rows removed and their bytes.
+    """
+    removed = 0
+    reclaimed = 0
+    after = None
+    while True:
+        groups = _compactable_groups(chunk_size, after if dry_run else None)
+        if not groups:
+            break
+        for user_id, notification_type, target_type, target_id, _ in groups:
+            rows = Notification.query.filter_by(
+                user_id=user_id,
+                notification_type=notification_type,
+                target_type=target_type,
+                target_id=target_id,
+                is_read=True
+            ).order_by(Notification.id.desc()).all()
+            newest, merged = rows[0], rows[1:]
+            reclaimed += _stored_bytes([row.id for row in merged])
+            removed += len(merged)
+            if dry_run:
+                continue
+
+            links = db.session.execute(
+                db.select(NotificationActor.notification_id, NotificationActor.actor_id)
+                .where(NotificationActor.notification_id.in_([row.id for row in rows]))
+            ).all()
+            known_ids = {actor_id for _, actor_id in links}
+            linked = Counter(notification_id for notification_id, _ in links)
+            # Rows from before notification_actor may count actors it has no link for
+            unattributed = sum(max(row.actor_count - linked[row.id], 0) for row in rows)
+
+            actors = []
+            for row in rows:
+                for actor in row.actors or []:
+                    if len(actors) < RECENT_ACTORS and all(actor['id'] != other['id'] for other in actors):
+                        actors.append(actor)
+            # An actor counted on several rows counts once; only the unlinked rest are added up
+            newest.actor_count = len(known_ids) + unattributed
+            newest.actors = actors
+            if actors:
+                newest.actor_id = actors[0]['id']
+            newest.content = coalesced_content(notification_type, actors, newest.actor_count)
+
+            merged_ids = [row.id for row in merged]
+            newest_ids = {actor_id for notification_id, actor_id in links if notification_id == newest.id}
+            db.session.execute(db.delete(NotificationActor).where(NotificationActor.notification_id.in_(merged_ids)))
+            db.session.add_all(
+                NotificationActor(notification_id=newest.id, actor_id=actor_id)
+                for actor_id in known_ids - newest_ids
+            )
+            db.session.execute(db.delete(Notification).where(Notification.id.in_(merged_ids)))
+        if not dry_run:
+            db.session.commit()
+        after = tuple(groups[-1][:4])
+    return removed, reclaimed
+
+
+def archive_notifications(max_age, chunk_size=500, delete=False, dry_run=False):
+    """Move read notifications older than ``max_age`` into notification_archive, or delete them.
+
+    Works through the oldest notifications in id order, one transaction per
+    chunk. Returns the rows removed and their bytes.
+    """
+    cutoff = datetime.utcnow() - max_age
+    removed = 0
+    reclaimed = 0
+    last_id = 0
+    while True:
+        notification_ids = db.session.scalars(
+            db.select(Notification.id)
+            .where(Notification.id > last_id, Notification.is_read == True, Notification.timestamp < cutoff)
+            .order_by(Notification.id)
+            .limit(chunk_size)
+        ).all()
+        if not notification_ids:
+            break
+        reclaimed += _stored_bytes(notification_ids)
+        removed += len(notification_ids)
+        last_id = notification_ids[-1]
+        if dry_run:
+            continue
+
+        if not delete:
+            db.session.execute(
+                db.insert(NotificationArchive).from_select(
+                    ARCHIVED_COLUMNS + ('archived_at',),
+                    db.select(
+                        *[getattr(Notification, column) for column in ARCHIVED_COLUMNS],
+                        db.literal(datetime.utcnow(), db.DateTime)
+                    ).where(Notification.id.in_(notification_ids))
+                )
+            )
+        db.session.execute(
+            db.delete(NotificationActor).where(NotificationActor.notification_id.in_(notification_ids))
+        )
+        db.session.execute(db.delete(Notification).where(Notification.id.in_(notification_ids)))
+        db.session.commit()
+    return removed, reclaimed
+
+
+def prune_notifications(max_age_days, chunk_size=500, delete=False, dry_run=False):
+    """Compact read notifications, then archive (or delete) the old ones"""
+    compacted, compacted_bytes = compact_notifications(chunk_size, dry_run)
+    removed, removed_bytes = archive_notifications(timedelta(days=max_age_days), chunk_size, delete, dry_run)
+    return PruneReport(
+        compacted=compacted,
+        archived=0 if delete else removed,
+        deleted=removed if delete else 0,
+        bytes=compacted_bytes + removed_bytes
+    )
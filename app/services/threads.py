@@ -0,0 +1,133 @@
+from collections import namedtuple
+from app import db
+from app.models import Message, Conversation
+from .conversations import mark_conversation_read, read_watermarks
+
+# One page of a message thread, oldest first, and the ``before`` id of the page older than it
+ThreadPage = namedtuple('ThreadPage', ['messages', 'before'])
+
+
+def thread_filter(user_id, other_id):
+    """Match the messages exchanged between two users, in either direction"""
+    return db.or_(
+        db.and_(Message.sender_id == user_id, Message.recipient_id == other_id),
+        db.and_(Message.sender_id == other_id, Message.recipient_id == user_id)
+    )
+
+
+def thread_position(user_id, other_id, message_id):
+    """Return the (timestamp, id) position of a message in a thread.
+
+    Raises ``ValueError`` if the message is not part of the thread.
+    """
+    timestamp = db.session.execute(
+        db.select(Message.timestamp).where(Message.id == message_id, thread_filter(user_id, other_id))
+    ).scalar()
+    if timestamp is None:
+        raise ValueError(f"Message {message_id} is not in this conversation")
+    return timestamp, message_id
+
+
+def thread_query(columns, user_id, other_id, limit=None, before=None):
+    """Select ``columns`` of a thread's messages, newest first, before a position.
+
+    ``id`` and ``timestamp`` are always selected first, for the cursor.
+    Each direction is read as its own branch so it is a range scan on the
+    (sender_id, recipient_id, timestamp) index, limited before the merge.
+    """
+    branches = []
+    for sender_id, recipient_id in ((user_id, other_id), (other_id, user_id)):
+        branch = db.select(Message.id, Message.timestamp, *columns).where(
+            Message.sender_id == sender_id,
+            Message.recipient_id == recipient_id
+        )
+        if before is not None:
+            timestamp, message_id = before
+            branch = branch.where(db.or_(
+                Message.timestamp < timestamp,
+                db.and_(Message.timestamp == timestamp, Message.id < message_id)
+            ))
+        if limit is not None:
+            branch = branch.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit)
+        branches.append(db.select(branch.subquery()))
+    combined = db.union_all(*branches).subquery('thread')
+    query = db.select(combined).order_by(combined.c[1].desc(), combined.c[0].desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def load_thread(columns, user_id, other_id, limit, before=None):
+    """Load a page of the newest ``limit`` messages of a thread before a message id.
+
+    Rows are returned oldest first, ready to render. Raises ``ValueError``
+    if ``before`` is not a message of the thread.
+    """
+    position = thread_position(user_id, other_id, before) if before is not None else None
+    rows = db.session.execute(thread_query(columns, user_id, other_id, limit + 1, position)).all()
+    older = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        older = rows[-1][0]
+    rows.reverse()
+    return ThreadPage(rows, older)
+
+
+def mark_thread_read(user_id, other_id):
+    """Mark every message ``other_id`` sent to ``user_id`` as read.
+
+    Only moves ``user_id``'s read watermark on the conversation; the
+    messages' own ``is_read`` flags catch up in ``sync_read_flags``.
+    Returns whether anything was unread.
+    """
+    return mark_conversation_read(user_id, other_id)
+
+
+def sync_read_flags(user_id, other_id):
+    """Set ``is_read`` on the thread's messages at or below their recipient's read watermark.
+
+    Keeps the column right for readers that still use it, such as
+    ``/api/messages/<user_id>``. Returns the number of messages updated.
+    """
+    last_read, other_last_read = read_watermarks(user_id, other_id)
+    updated = 0
+    for sender_id, recipient_id, watermark in ((other_id, user_id, last_read), (user_id, other_id, other_last_read)):
+        if watermark:
+            updated += db.session.execute(
+                db.update(Message)
+                .where(
+                    Message.recipient_id == recipient_id,
+                    Message.is_read == False,
+                    Message.sender_id == sender_id,
+                    Message.id <= watermark
+                )
+                .values(is_read=True)
+            ).rowcount
+    return updated
+
+
+def sync_all_read_flags(chunk_size=500):
+    """Apply every conversation's read watermarks to ``Message.is_read`` in id-ordered chunks.
+
+    Each chunk of conversations is committed on its own. Returns the number
+    of conversations checked and of messages updated.
+    """
+    checked = 0
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Conversation.id, Conversation.user_low_id, Conversation.user_high_id)
+            .where(Conversation.id > last_id)
+            .order_by(Conversation.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        for row in rows:
+            updated += sync_read_flags(row.user_low_id, row.user_high_id)
+        db.session.commit()
+        checked += len(rows)
+        last_id = rows[-1].id
+    return checked, updated
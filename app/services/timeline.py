@@ -0,0 +1,232 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+from app import db
+from app.models import Post, PostShare, Friendship
+from .feed_item import POST_ITEM, SHARE_ITEM, FeedItem, resolve_feed_items
+
+# One page of a timeline plus the opaque cursor for the page after it
+FeedPage = namedtuple('FeedPage', ['items', 'next_cursor'])
+
+
+def encode_cursor(sort_date, kind, item_id):
+    """Encode a timeline position as an opaque, URL-safe cursor"""
+    raw = f"{sort_date.isoformat()}|{kind}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into its (sort_date, kind, item_id) position.
+
+    Raises ``ValueError`` for anything that was not produced by ``encode_cursor``.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_date, kind, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(sort_date), int(kind), int(item_id)
+    except (TypeError, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _friend_id_selects(user_id):
+    """Select friend ids from both sides of the accepted friendships of a user"""
+    return [
+        db.select(Friendship.friend_id).where(
+            Friendship.user_id == user_id,
+            Friendship.status == 'accepted'
+        ),
+        db.select(Friendship.user_id).where(
+            Friendship.friend_id == user_id,
+            Friendship.status == 'accepted'
+        )
+    ]
+
+
+def friend_ids_query(user_id):
+    """Select the ids of a user's accepted friends (both directions)"""
+    return db.union_all(*_friend_id_selects(user_id))
+
+
+def feed_author_ids(user_id):
+    """Select the ids whose posts and shares appear in a user's home feed"""
+    return db.union_all(
+        *_friend_id_selects(user_id),
+        db.select(db.literal(user_id))
+    )
+
+
+def _timeline_selects(author_ids, include_shares):
+    """Build the post and share selects that make up the timeline"""
+    posts = db.select(
+        db.literal(POST_ITEM).label('kind'),
+        Post.id.label('item_id'),
+        Post.id.label('post_id'),
+        Post.user_id.label('user_id'),
+        Post.date_posted.label('sort_date')
+    )
+    shares = db.select(
+        db.literal(SHARE_ITEM).label('kind'),
+        PostShare.id.label('item_id'),
+        PostShare.post_id.label('post_id'),
+        PostShare.user_id.label('user_id'),
+        PostShare.shared_at.label('sort_date')
+    )
+    if author_ids is not None:
+        posts = posts.where(Post.user_id.in_(author_ids))
+        shares = shares.where(PostShare.user_id.in_(author_ids))
+
+    selects = [(POST_ITEM, posts, Post.date_posted, Post.id)]
+    if include_shares:
+        selects.append((SHARE_ITEM, shares, PostShare.shared_at, PostShare.id))
+    return selects
+
+
+def _before(kind, date_column, id_column, position):
+    """Filter one branch down to the items that sort after a cursor position.
+
+    The timeline is ordered by (sort_date, kind, item_id) descending. The kind
+    is constant within a branch, so the comparison reduces to a range on the
+    branch's (date, id) index.
+    """
+    sort_date, cursor_kind, item_id = position
+    if kind < cursor_kind:
+        return date_column <= sort_date
+    if kind > cursor_kind:
+        return date_column < sort_date
+    return db.or_(
+        date_column < sort_date,
+        db.and_(date_column == sort_date, id_column < item_id)
+    )
+
+
+def timeline_branches(author_ids=None, include_shares=True, limit=None, before=None):
+    """Build the filtered, ordered and limited branches of a timeline.
+
+    ``author_ids`` may be a list or a select of user ids; ``None`` means every
+    author. ``before`` is a decoded cursor position to seek past. Each branch
+    is limited on its own so the database only reads the head of its index.
+    """
+    branches = []
+    for kind, branch, date_column, id_column in _timeline_selects(author_ids, include_shares):
+        if before is not None:
+            branch = branch.where(_before(kind, date_column, id_column, before))
+        if limit is not None:
+            branch = branch.order_by(date_column.desc(), id_column.desc()).limit(limit)
+        branches.append(branch)
+    return branches
+
+
+def merge_branches(branches, limit=None):
+    """Combine timeline branches into one UNION ALL, newest first.
+
+    Every branch must select ``kind``, ``item_id``, ``post_id``, ``user_id``
+    and ``sort_date``.
+    """
+    combined = db.union_all(*[db.select(branch.subquery()) for branch in branches]).subquery('timeline')
+    query = db.select(combined).order_by(
+        combined.c.sort_date.desc(),
+        combined.c.kind.desc(),
+        combined.c.item_id.desc()
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def timeline_query(author_ids=None, include_shares=True, limit=None, before=None):
+    """Build a UNION ALL of original posts and shares, newest first"""
+    return merge_branches(timeline_branches(author_ids, include_shares, limit, before), limit)
+
+
+def posts_query(columns, author_ids=None, since=None, limit=None, before=None):
+    """Select ``columns`` of original posts, newest first, after a cursor position.
+
+    ``id`` and ``date_posted`` are always selected so the caller can encode
+    the cursor of the last row. ``since`` keeps posts from that time onwards.
+    """
+    query = db.select(Post.id, Post.date_posted, *columns)
+    if author_ids is not None:
+        query = query.where(Post.user_id.in_(author_ids))
+    if since is not None:
+        query = query.where(Post.date_posted >= since)
+    if before is not None:
+        query = query.where(_before(POST_ITEM, Post.date_posted, Post.id, before))
+    query = query.order_by(Post.date_posted.desc(), Post.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def load_items(rows):
+    """Load feed items for timeline rows, keeping their order.
+
+    Rows only need ``kind`` and ``item_id``. Only scalar columns are read;
+    no ORM objects are built for the posts or shares themselves.
+    """
+    post_ids = [row.item_id for row in rows if row.kind == POST_ITEM]
+    share_ids = [row.item_id for row in rows if row.kind == SHARE_ITEM]
+    posts = {}
+    shares = {}
+    if post_ids:
+        posts = {
+            row.id: FeedItem(POST_ITEM, row.id, None, row.user_id, row.user_id,
+                             row.title, row.content, row.date_posted)
+            for row in db.session.execute(
+                db.select(Post.id, Post.user_id, Post.title, Post.content, Post.date_posted)
+                .where(Post.id.in_(post_ids))
+            )
+        }
+    if share_ids:
+        shares = {
+            row.id: FeedItem(SHARE_ITEM, row.post_id, row.id, row.user_id, row.author_id, row.title,
+                             row.share_content if row.share_content else row.content, row.shared_at)
+            for row in db.session.execute(
+                db.select(
+                    PostShare.id, PostShare.post_id, PostShare.user_id, PostShare.share_content,
+                    PostShare.shared_at, Post.user_id.label('author_id'), Post.title, Post.content
+                )
+                .join(Post, Post.id == PostShare.post_id)
+                .where(PostShare.id.in_(share_ids))
+            )
+        }
+
+    items = []
+    for row in rows:
+        if row.kind == POST_ITEM and row.item_id in posts:
+            items.append(posts[row.item_id])
+        elif row.kind == SHARE_ITEM and row.item_id in shares:
+            items.append(shares[row.item_id])
+    return resolve_feed_items(items)
+
+
+def page_from_rows(rows, limit=None):
+    """Build a page from up to ``limit + 1`` timeline rows"""
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.sort_date, last.kind, last.item_id)
+    return FeedPage(load_items(rows), next_cursor)
+
+
+def load_page(build_query, limit=None, cursor=None):
+    """Load one page of timeline items, starting after ``cursor`` if given.
+
+    ``build_query(limit, before)`` must return a merged timeline select. One
+    row more than ``limit`` is fetched to tell whether another page exists.
+    Raises ``ValueError`` for an invalid cursor.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    rows = db.session.execute(
+        build_query(limit + 1 if limit is not None else None, before)
+    ).all()
+    return page_from_rows(rows, limit)
+
+
+def load_timeline(author_ids=None, include_shares=True, limit=None, cursor=None):
+    """Load one page of the posts and shares by ``author_ids``"""
+    return load_page(
+        lambda page_limit, before: timeline_query(author_ids, include_shares, page_limit, before),
+        limit,
+        cursor
+    )
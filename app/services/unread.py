@@ -0,0 +1,60 @@
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.models import Conversation, Notification
+from .cache import LRUCache
+
+# What the navbar badges show
+UnreadCounts = namedtuple('UnreadCounts', ['notifications', 'messages'])
+
+
+def init_unread_cache(app):
+    """Create the application's per-user unread counter cache from its config.
+
+    The cache is only kept when this process applies the notification
+    outbox itself, since nothing else can drop its entries; with a separate
+    dispatcher, or ``UNREAD_CACHE_SIZE`` of 0, counts are always queried.
+    """
+    if app.config['OUTBOX_DISPATCHER'] == 'thread' and app.config['UNREAD_CACHE_SIZE'] > 0:
+        app.extensions['unread_cache'] = LRUCache(app.config['UNREAD_CACHE_SIZE'], app.config['UNREAD_CACHE_TTL'])
+    else:
+        app.extensions['unread_cache'] = None
+
+
+def get_unread_cache():
+    """Return the current application's unread counter cache, or ``None`` if counts are not cached"""
+    return current_app.extensions['unread_cache']
+
+
+def unread_counts(user_id):
+    """Return a user's unread notification and message counts.
+
+    Served from the cache, or read in one query that counts notifications
+    from the (user_id, is_read) index and adds up the user's side of the
+    unread counts on their conversations.
+    """
+    cache = get_unread_cache()
+    counts = cache.get(user_id) if cache is not None else None
+    if counts is None:
+        row = db.session.execute(db.select(
+            db.select(db.func.count(Notification.id))
+            .where(Notification.user_id == user_id, Notification.is_read == False)
+            .scalar_subquery(),
+            db.select(db.func.coalesce(db.func.sum(Conversation.low_unread_count), 0))
+            .where(Conversation.user_low_id == user_id)
+            .scalar_subquery()
+            + db.select(db.func.coalesce(db.func.sum(Conversation.high_unread_count), 0))
+            .where(Conversation.user_high_id == user_id)
+            .scalar_subquery()
+        )).one()
+        counts = UnreadCounts(*row)
+        if cache is not None:
+            cache.set(user_id, counts)
+    return counts
+
+
+def invalidate_unread(*user_ids):
+    """Drop the cached counters of users who got, read or lost a notification or message"""
+    cache = get_unread_cache()
+    if cache is not None:
+        cache.delete(*user_ids)
@@ -0,0 +1,98 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from flask import current_app, request, session
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, Post, PostLike, Comment
+from .unread import unread_counts
+
+
+def touch_post(post_id):
+    """Bump a post's version stamp for changes that do not update its row"""
+    db.session.execute(db.update(Post).where(Post.id == post_id).values(updated_at=datetime.utcnow()))
+
+
+def touch_user(user_id):
+    """Bump a user's version stamp for changes that do not update their row"""
+    db.session.execute(db.update(User).where(User.id == user_id).values(updated_at=datetime.utcnow()))
+
+
+def post_version(post_id, viewer_id=None):
+    """Read the version stamps of a post in one query, or ``None`` if it does not exist.
+
+    Covers the post (and so its counters and comments), its author and the
+    authors of its comments. With a viewer it also covers what the page
+    shows only to them: their profile, their like and their unread
+    counters.
+    """
+    author = aliased(User)
+    columns = [
+        Post.updated_at,
+        author.updated_at,
+        db.select(db.func.max(User.updated_at))
+        .join(Comment, Comment.user_id == User.id)
+        .where(Comment.post_id == Post.id)
+        .scalar_subquery()
+    ]
+    if viewer_id is not None:
+        columns += [
+            db.select(User.updated_at).where(User.id == viewer_id).scalar_subquery(),
+            db.exists().where(PostLike.post_id == Post.id, PostLike.user_id == viewer_id)
+        ]
+    row = db.session.execute(
+        db.select(*columns).join(author, author.id == Post.user_id).where(Post.id == post_id)
+    ).first()
+    if row is None:
+        return None
+    if viewer_id is not None:
+        return tuple(row) + tuple(unread_counts(viewer_id))
+    return tuple(row)
+
+
+def user_version(user_id):
+    """Read a user's version stamp, or ``None`` if they do not exist"""
+    updated_at = db.session.scalar(db.select(User.updated_at).where(User.id == user_id))
+    return (updated_at,) if updated_at is not None else None
+
+
+def conditional_response(stamps, build, weak=False, last_modified=True):
+    """Answer 304 if the client's copy matches ``stamps``, otherwise call ``build``.
+
+    The ETag is a digest of the stamps and Last-Modified the latest of their
+    timestamps, so nothing is loaded or serialized for a 304.
+    """
+    etag = hashlib.sha1(repr(stamps).encode()).hexdigest()
+    modified = max(stamp for stamp in stamps if isinstance(stamp, datetime))
+    modified = modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    # If-None-Match takes precedence over If-Modified-Since when both are sent
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        fresh = last_modified and request.if_modified_since is not None and request.if_modified_since >= modified
+
+    response = current_app.response_class(status=304) if fresh else current_app.make_response(build())
+    response.set_etag(etag, weak=weak)
+    if last_modified:
+        response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_page(stamps, build):
+    """Like ``conditional_response`` for HTML pages that differ per session.
+
+    Pages with pending flash messages are always rendered, and the ETag
+    rolls over at half the CSRF token lifetime so cached forms stay valid.
+    """
+    if '_flashes' in session:
+        response = current_app.make_response(build())
+    else:
+        csrf_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+        if csrf_limit:
+            stamps += (int(time.time()) // max(csrf_limit // 2, 1),)
+        response = conditional_response(stamps, build, weak=True, last_modified=False)
+    response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
@@ -0,0 +1,106 @@
+"""Compare the compiled API serializers with building dicts from ORM objects.
+
+Runs against a throwaway in-memory SQLite database:
+
+    python benchmark_serializers.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
+from app import create_app, db
+from app.models import User, Post
+from app.api.serializers import POST_SCHEMA
+from config import Config
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+def seed(rows, users=100):
+    """Insert ``users`` authors and ``rows`` posts spread across them"""
+    start = datetime.utcnow()
+    db.session.execute(db.insert(User), [{
+        'username': f'user{i}',
+        'email': f'user{i}@example.com',
+        'password': 'x',
+        'first_name': f'First{i}',
+        'last_name': f'Last{i}',
+        'location': 'Somewhere',
+        'date_joined': start,
+        'updated_at': start
+    } for i in range(users)])
+    db.session.execute(db.insert(Post), [{
+        'title': f'Post {i}',
+        'content': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+        'date_posted': start - timedelta(seconds=i),
+        'updated_at': start,
+        'user_id': i % users + 1,
+        'like_counter': i % 17,
+        'comment_counter': i % 5
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def orm_posts():
+    """The previous API path: load Post and User entities, then build dicts by hand"""
+    posts = Post.query.options(joinedload(Post.author)).order_by(Post.date_posted.desc()).all()
+    return [{
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'date_posted': post.date_posted.isoformat(),
+        'author': {
+            'id': post.author.id,
+            'username': post.author.username,
+            'first_name': post.author.first_name,
+            'last_name': post.author.last_name,
+            'location': post.author.location
+        },
+        'like_count': post.like_count(),
+        'comment_count': post.comment_count()
+    } for post in posts]
+
+
+def compiled_posts():
+    """The serializer path: select the schema's columns and convert rows by position"""
+    serialize = POST_SCHEMA.compile()
+    rows = db.session.execute(POST_SCHEMA.select().order_by(Post.date_posted.desc()))
+    return [serialize(row) for row in rows]
+
+
+def best_of(function, repeat):
+    """Return the fastest of ``repeat`` runs in seconds, starting each from an empty session"""
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+
+        if orm_posts() != compiled_posts():
+            raise SystemExit('The two paths produced different payloads')
+
+        orm = best_of(orm_posts, args.repeat)
+        compiled = best_of(compiled_posts, args.repeat)
+        print(f"{args.rows} posts, best of {args.repeat}:")
+        print(f"  ORM entities + dicts:  {orm * 1000:8.1f} ms")
+        print(f"  compiled serializers:  {compiled * 1000:8.1f} ms  ({orm / compiled:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,56 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Users with more friends than this are not fanned out on write;
+    # their friends' feeds read their posts at request time instead
+    FEED_FANOUT_MAX_FRIENDS = int(os.environ.get('FEED_FANOUT_MAX_FRIENDS') or 1000)
+    # Per-user home feed cache: number of users, seconds to live, and items kept per user
+    FEED_CACHE_SIZE = int(os.environ.get('FEED_CACHE_SIZE') or 10000)
+    FEED_CACHE_TTL = int(os.environ.get('FEED_CACHE_TTL') or 60)
+    FEED_CACHE_DEPTH = int(os.environ.get('FEED_CACHE_DEPTH') or 50)
+    # Per-user cache of the navbar's unread counters: number of users and seconds to live.
+    # Each process keeps its own and only drops the entries it changed, so it is skipped when
+    # OUTBOX_DISPATCHER is 'worker'; with several web workers, set the size to 0 or accept
+    # badges (and post ETags) lagging by up to the TTL
+    UNREAD_CACHE_SIZE = int(os.environ.get('UNREAD_CACHE_SIZE') or 10000)
+    UNREAD_CACHE_TTL = int(os.environ.get('UNREAD_CACHE_TTL') or 300)
+    # Posts per page of the home feed and profile timelines
+    FEED_PAGE_SIZE = int(os.environ.get('FEED_PAGE_SIZE') or 5)
+    # Notifications per page of the notification center
+    NOTIFICATION_PAGE_SIZE = int(os.environ.get('NOTIFICATION_PAGE_SIZE') or 20)
+    # Conversations per page of the messages inbox
+    INBOX_PAGE_SIZE = int(os.environ.get('INBOX_PAGE_SIZE') or 20)
+    # Messages per page of a conversation
+    MESSAGE_PAGE_SIZE = int(os.environ.get('MESSAGE_PAGE_SIZE') or 30)
+    # Default and largest page size of API lists
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE') or 20)
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE') or 100)
+    # Most ids accepted by the batch endpoints
+    API_BATCH_MAX_IDS = int(os.environ.get('API_BATCH_MAX_IDS') or 200)
+    # Rows read from the database per batch when an API list is streamed
+    API_STREAM_BATCH_SIZE = int(os.environ.get('API_STREAM_BATCH_SIZE') or 500)
+    # Notification outbox: 'thread' drains it in a background thread of each app process,
+    # 'worker' leaves it to `flask notifications dispatch` (and turns off the unread counter cache)
+    OUTBOX_DISPATCHER = os.environ.get('OUTBOX_DISPATCHER') or 'thread'
+    # Outbox entries applied per transaction, and seconds between polls for leftover entries
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE') or 100)
+    OUTBOX_POLL_INTERVAL = int(os.environ.get('OUTBOX_POLL_INTERVAL') or 5)
+    # Read notifications older than this many days are archived by `flask notifications prune`
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS') or 90)
+    # Server-sent events: seconds between heartbeats, and how long clients wait before reconnecting (ms)
+    SSE_HEARTBEAT = int(os.environ.get('SSE_HEARTBEAT') or 15)
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS') or 5000)
+    # Response compression: smallest body worth compressing, zlib/brotli level, and content types to compress
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+    COMPRESS_MIMETYPES = [
+        'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript',
+        'application/javascript', 'application/json', 'application/x-ndjson',
+        'application/xml', 'image/svg+xml'
+    ]
+    # Logged-out home feed, rendered once and shared: pages kept and seconds between rebuilds
+    PUBLIC_FEED_PAGES = int(os.environ.get('PUBLIC_FEED_PAGES') or 5)
+    PUBLIC_FEED_TTL = int(os.environ.get('PUBLIC_FEED_TTL') or 300)
 
 class DevelopmentConfig(Config):
     DEBUG = True
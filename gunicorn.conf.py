@@ -0,0 +1,28 @@
+"""Gunicorn settings, loaded automatically from the working directory.
+
+Event streams (``/events``) hold a connection open per logged-in browser
+tab, so the default worker class is ``gevent``: each open stream is an idle
+greenlet, and one worker holds up to ``GUNICORN_WORKER_CONNECTIONS`` of
+them next to ordinary requests. Event streams are only woken by posts
+written in the same process, so run a single worker unless a shared broker
+is in place (and set ``UNREAD_CACHE_SIZE=0`` when running more than one). ``GUNICORN_WORKER_CLASS=gthread`` falls back to a thread per
+connection, where every open stream takes one of ``GUNICORN_THREADS``.
+"""
+import os
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'gevent'
+workers = int(os.environ.get('GUNICORN_WORKERS') or 1)
+# Concurrent connections (including open event streams) per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or 2000)
+# Concurrent requests per gthread worker
+threads = int(os.environ.get('GUNICORN_THREADS') or 100)
+# Streams send a heartbeat every SSE_HEARTBEAT seconds, so a quiet stream is not a stuck worker
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 60)
+keepalive = 5
+
+
+def post_worker_init(worker):
+    """Start the notification dispatcher as soon as a worker has loaded the app"""
+    from app.services import start_outbox_dispatcher
+    start_outbox_dispatcher(worker.wsgi)
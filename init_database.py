@@ -32,7 +32,8 @@ def initialize_database():
             bio TEXT,
             children_count INTEGER DEFAULT 0,
             partners_count INTEGER DEFAULT 0,
-            date_joined DATETIME NOT NULL
+            date_joined DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL
         )
         ''',
         '''
@@ -42,6 +43,10 @@ def initialize_database():
             content TEXT NOT NULL,
             date_posted DATETIME NOT NULL,
             user_id INTEGER NOT NULL,
+            like_count INTEGER NOT NULL DEFAULT 0,
+            share_count INTEGER NOT NULL DEFAULT 0,
+            comment_count INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME NOT NULL,
             FOREIGN KEY (user_id) REFERENCES user (id)
         )
         ''',
@@ -79,8 +84,14 @@ def initialize_database():
             is_read BOOLEAN,
             notification_type VARCHAR(50) NOT NULL,
             post_id INTEGER,
+            actor_id INTEGER,
+            target_type VARCHAR(20),
+            target_id INTEGER,
+            actor_count INTEGER NOT NULL DEFAULT 1,
+            actors JSON,
             FOREIGN KEY (user_id) REFERENCES user (id),
-            FOREIGN KEY (post_id) REFERENCES post (id)
+            FOREIGN KEY (post_id) REFERENCES post (id),
+            FOREIGN KEY (actor_id) REFERENCES user (id)
         )
         ''',
         '''
@@ -140,6 +151,133 @@ def initialize_database():
             FOREIGN KEY (post_id) REFERENCES post (id),
             FOREIGN KEY (comment_id) REFERENCES comment (id)
         )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_post_user_id_date_posted ON post (user_id, date_posted, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_post_date_posted ON post (date_posted, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_post_share_user_id_shared_at ON post_share (user_id, shared_at, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_friendship_user_id_status ON friendship (user_id, status)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_friendship_friend_id_status ON friendship (friend_id, status)
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS feed_entry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            viewer_id INTEGER NOT NULL,
+            kind INTEGER NOT NULL,
+            item_id INTEGER NOT NULL,
+            post_id INTEGER NOT NULL,
+            actor_id INTEGER NOT NULL,
+            created_at DATETIME NOT NULL,
+            UNIQUE(viewer_id, kind, item_id),
+            FOREIGN KEY (viewer_id) REFERENCES user (id),
+            FOREIGN KEY (post_id) REFERENCES post (id),
+            FOREIGN KEY (actor_id) REFERENCES user (id)
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_feed_entry_viewer_id_created_at ON feed_entry (viewer_id, created_at, kind, item_id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_feed_entry_kind_item_id ON feed_entry (kind, item_id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_feed_entry_actor_id_viewer_id ON feed_entry (actor_id, viewer_id)
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS conversation (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_low_id INTEGER NOT NULL,
+            user_high_id INTEGER NOT NULL,
+            last_message_id INTEGER,
+            preview VARCHAR(140) NOT NULL,
+            last_activity DATETIME NOT NULL,
+            low_unread_count INTEGER NOT NULL DEFAULT 0,
+            high_unread_count INTEGER NOT NULL DEFAULT 0,
+            low_last_read_id INTEGER NOT NULL DEFAULT 0,
+            high_last_read_id INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(user_low_id, user_high_id),
+            FOREIGN KEY (user_low_id) REFERENCES user (id),
+            FOREIGN KEY (user_high_id) REFERENCES user (id),
+            FOREIGN KEY (last_message_id) REFERENCES message (id)
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_conversation_user_low_id_last_activity ON conversation (user_low_id, last_activity, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_conversation_user_high_id_last_activity ON conversation (user_high_id, last_activity, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_message_sender_id_recipient_id_timestamp ON message (sender_id, recipient_id, timestamp, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_message_recipient_id_is_read ON message (recipient_id, is_read)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_notification_user_id_is_read ON notification (user_id, is_read)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_notification_user_id_timestamp ON notification (user_id, timestamp, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_notification_user_id_target ON notification (user_id, notification_type, target_type, target_id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_notification_actor_id_target ON notification (actor_id, target_type, target_id)
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS notification_actor (
+            notification_id INTEGER NOT NULL,
+            actor_id INTEGER NOT NULL,
+            PRIMARY KEY (notification_id, actor_id),
+            FOREIGN KEY (notification_id) REFERENCES notification (id) ON DELETE CASCADE,
+            FOREIGN KEY (actor_id) REFERENCES user (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action VARCHAR(20) NOT NULL,
+            user_id INTEGER NOT NULL,
+            actor_id INTEGER NOT NULL,
+            notification_type VARCHAR(50) NOT NULL,
+            content TEXT,
+            target_type VARCHAR(20),
+            target_id INTEGER,
+            post_id INTEGER,
+            created_at DATETIME NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES user (id),
+            FOREIGN KEY (actor_id) REFERENCES user (id),
+            FOREIGN KEY (post_id) REFERENCES post (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS notification_archive (
+            id INTEGER PRIMARY KEY,
+            content TEXT NOT NULL,
+            timestamp DATETIME NOT NULL,
+            user_id INTEGER NOT NULL,
+            post_id INTEGER,
+            is_read BOOLEAN,
+            notification_type VARCHAR(50) NOT NULL,
+            actor_id INTEGER,
+            target_type VARCHAR(20),
+            target_id INTEGER,
+            actor_count INTEGER NOT NULL,
+            actors JSON,
+            archived_at DATETIME NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_notification_archive_user_id_timestamp ON notification_archive (user_id, timestamp)
         '''
     ]
 
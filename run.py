@@ -1,4 +1,5 @@
 from app import create_app
+from app.services import start_outbox_dispatcher
 from config import Config
 
 # Automatically initialize database if needed
@@ -11,4 +12,5 @@ except Exception as e:
 application = create_app()
 
 if __name__ == '__main__':
+    start_outbox_dispatcher(application)
     application.run(debug=False)
\ No newline at end of file